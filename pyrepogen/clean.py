@@ -2,48 +2,273 @@
 # -*- coding: utf-8 -*-
 
 
+import os
+import sys
 import stat
 import shutil
+import fnmatch
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures, FIRST_COMPLETED
 from pathlib import Path
 
 from . import settings
 from . import exceptions
 from . import logger
+from . import pygittools
 
 
 _logger = logger.get_logger(__name__)
 
 
-def clean(cwd='.'):
-    _clean_files(cwd)
-    _clean_dirs(cwd)
+def clean(cwd='.', wait=True, dry_run=False, git_ignored=False, keep=None):
+    if git_ignored:
+        files_paths, dirs_paths = _find_git_ignored_paths(cwd, settings.CLEAN_GIT_KEEP + list(keep or []))
+    else:
+        files_paths, dirs_paths = _find_paths_to_clean(cwd, settings.FILES_TO_CLEAN, settings.DIRS_TO_CLEAN)
+    if dry_run:
+        return _report_paths_to_clean(files_paths + dirs_paths, cwd)
+    
+    _remove_files(files_paths, cwd)
+    _remove_dirs(dirs_paths, cwd, wait)
 
 
 def _clean_files(cwd, files_list=None):
     files_list = settings.FILES_TO_CLEAN if files_list is None else files_list
-    for file_pattern in files_list:
-        files_paths = sorted(Path(cwd).glob(file_pattern))
-        for file_path in files_paths:
-            _logger.info(f'Remove file: {file_path.relative_to(Path(cwd).resolve())}')
-            file_path.unlink()
+    files_paths, _ = _find_paths_to_clean(cwd, files_list, [])
+    _remove_files(files_paths, cwd)
 
 
-def _clean_dirs(cwd, dirs_list=None):
+def _clean_dirs(cwd, dirs_list=None, wait=True):
     dirs_list = settings.DIRS_TO_CLEAN if dirs_list is None else dirs_list
+    _, dirs_paths = _find_paths_to_clean(cwd, [], dirs_list)
+    _remove_dirs(dirs_paths, cwd, wait)
+
+
+def _find_paths_to_clean(cwd, files_list, dirs_list):
+    root_dirs_patterns = []
+    recursive_dirs_patterns = []
     for directory in dirs_list:
         if directory['flag'] == '.':
-            dirs_paths = sorted(Path(cwd).glob(directory['name']))
+            root_dirs_patterns.append(directory['name'])
         elif directory['flag'] == 'r':
-            dirs_paths = sorted(Path(cwd).rglob(directory['name']))
+            root_dirs_patterns.append(directory['name'])
+            recursive_dirs_patterns.append(directory['name'])
         else:
             raise exceptions.ValueError(f'Unknown remove flag {directory["flag"]}', _logger)
+    
+    root_path = Path(cwd).resolve()
+    files_paths = []
+    dirs_paths = []
+    dirs_to_scan = [str(root_path)]
+    while dirs_to_scan:
+        directory = dirs_to_scan.pop()
+        is_root = directory == str(root_path)
+        dirs_patterns = root_dirs_patterns if is_root else recursive_dirs_patterns
+        if not dirs_patterns and not is_root:
+            continue
+        
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if is_root and entry.name == settings.DirName.CLEAN_TRASH:
+                    continue
+                if entry.is_dir():
+                    if _match_any(entry.name, dirs_patterns):
+                        dirs_paths.append(Path(entry.path))
+                    elif not entry.is_symlink():
+                        dirs_to_scan.append(entry.path)
+                elif is_root and _match_any(entry.name, files_list):
+                    files_paths.append(Path(entry.path))
+    
+    return sorted(files_paths), sorted(dirs_paths)
+
+
+def _find_git_ignored_paths(cwd, keep):
+    try:
+        ignored_paths = pygittools.get_ignored_paths(cwd)
+    except pygittools.PygittoolsError as e:
+        raise exceptions.RuntimeError(f'Listing git ignored files error: {e}', _logger)
+    
+    keep = [Path(pattern).as_posix().rstrip('/') for pattern in keep]
+    root_path = Path(cwd).resolve()
+    files_paths = []
+    dirs_paths = []
+    paths_to_check = [Path(path) for path in ignored_paths]
+    while paths_to_check:
+        rel_path = paths_to_check.pop()
+        if _match_any(rel_path.as_posix(), keep) or _match_any(rel_path.name, keep):
+            continue
+        
+        path = root_path / rel_path
+        if path.is_dir() and not path.is_symlink():
+            if any(pattern.startswith(f'{rel_path.as_posix()}/') for pattern in keep):
+                paths_to_check.extend(rel_path / child.name for child in path.iterdir())
+            else:
+                dirs_paths.append(path)
+        elif path.exists() or path.is_symlink():
+            files_paths.append(path)
+    
+    return sorted(files_paths), sorted(dirs_paths)
+
+
+def _report_paths_to_clean(paths, cwd):
+    sizes = _get_paths_sizes(paths)
+    for path in paths:
+        kind = 'directory' if path.is_dir() and not path.is_symlink() else 'file'
+        _logger.info(f'Would remove {kind}: {path.relative_to(Path(cwd).resolve())} ({_format_size(sizes[path])})')
+    _logger.info(f'Total space to reclaim: {_format_size(sum(sizes.values()))}')
+    
+    return [(path, sizes[path]) for path in paths]
+
+
+def _get_paths_sizes(paths):
+    sizes = {}
+    with ThreadPoolExecutor(max_workers=settings.CLEAN_MAX_WORKERS) as executor:
+        pending = {}
+        for path in paths:
+            try:
+                path_stat = os.lstat(path)
+            except OSError:
+                sizes[path] = 0
+                continue
+            sizes[path] = _get_disk_usage(path_stat)
+            if stat.S_ISDIR(path_stat.st_mode):
+                pending[executor.submit(_scan_dir_size, path)] = path
+        
+        while pending:
+            done, _ = wait_futures(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                size, subdirs = future.result()
+                sizes[path] += size
+                for subdir in subdirs:
+                    pending[executor.submit(_scan_dir_size, subdir)] = path
+    
+    return sizes
+
+
+def _scan_dir_size(path):
+    size = 0
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    size += _get_disk_usage(entry.stat(follow_symlinks=False))
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    
+    return size, subdirs
+
+
+def _get_disk_usage(path_stat):
+    blocks = getattr(path_stat, 'st_blocks', None)
+    return blocks * 512 if blocks is not None else path_stat.st_size
+
+
+def _format_size(size):
+    for unit in ['B', 'KiB', 'MiB', 'GiB']:
+        if size < 1024:
+            break
+        size /= 1024
+    else:
+        unit = 'TiB'
+    
+    return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+
 
-        for dir_path in dirs_paths:
-            if dir_path.is_dir():
-                _logger.info(f'Remove directory: {dir_path.relative_to(Path(cwd).resolve())}')
-                shutil.rmtree(dir_path, ignore_errors=False, onerror=_error_remove_readonly)
+def _match_any(name, patterns):
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def _remove_files(files_paths, cwd):
+    for file_path in files_paths:
+        _logger.info(f'Remove file: {file_path.relative_to(Path(cwd).resolve())}')
+        file_path.unlink()
+
+
+def _remove_dirs(dirs_paths, cwd, wait=True):
+    trash_path = Path(cwd).resolve() / settings.DirName.CLEAN_TRASH
+    batch_path = None
+    for index, dir_path in enumerate(dirs_paths):
+        _logger.info(f'Remove directory: {dir_path.relative_to(Path(cwd).resolve())}')
+        if dir_path.is_symlink():
+            dir_path.unlink()
+            continue
+        
+        try:
+            if batch_path is None:
+                trash_path.mkdir(exist_ok=True)
+                batch_path = Path(tempfile.mkdtemp(dir=trash_path))
+            dir_path.rename(batch_path / f'{index}_{dir_path.name}')
+        except OSError:
+            shutil.rmtree(dir_path, ignore_errors=False, onerror=_error_remove_readonly)
+    
+    if not trash_path.exists():
+        return
+    
+    if wait:
+        _empty_trash(trash_path)
+    else:
+        _spawn_empty_trash(trash_path)
+
+
+def _empty_trash(trash_path):
+    subtrees = []
+    for batch_path in _list_dir(trash_path):
+        for dir_path in _list_dir(batch_path):
+            subtrees.extend(_list_dir(dir_path) if dir_path.is_dir() and not dir_path.is_symlink() else [dir_path])
+    
+    with ThreadPoolExecutor(max_workers=settings.CLEAN_MAX_WORKERS) as executor:
+        list(executor.map(_remove_path, subtrees))
+    
+    shutil.rmtree(trash_path, ignore_errors=False, onerror=_error_remove_readonly)
+
+
+def _spawn_empty_trash(trash_path):
+    if os.name == 'nt':
+        detach_options = {'creationflags': subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        detach_options = {'start_new_session': True}
+    
+    subprocess.Popen([sys.executable, '-m', __name__, str(trash_path)],
+                     cwd=Path(__file__).resolve().parents[1].__str__(),
+                     stdin=subprocess.DEVNULL,
+                     stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL,
+                     **detach_options)
+    _logger.info(f'Removing directories in the background from {trash_path.name}')
+
+
+def _list_dir(path):
+    try:
+        return list(Path(path).iterdir())
+    except FileNotFoundError:
+        return []
+
+
+def _remove_path(path):
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path, ignore_errors=False, onerror=_error_remove_readonly)
+    else:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except PermissionError:
+            _error_remove_readonly(None, path, None)
 
 
 def _error_remove_readonly(_action, name, _exc):
+    if not os.path.lexists(name):
+        return
     Path(name).chmod(stat.S_IWRITE)
     Path(name).unlink()
+
+
+if __name__ == '__main__':
+    _empty_trash(Path(sys.argv[1]))
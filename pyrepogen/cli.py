@@ -128,6 +128,9 @@ def generate(args, cwd):
             config_dict['is_git'] = wizard.choose_bool(__name__, 'Initialize GIT repository?')
             if config_dict['is_git']:
                 config_dict['git_origin'] = wizard.get_data(__name__, 'Enter GIT origin url')
+                if config_dict['git_origin'] != '':
+                    config_dict.update(_get_clone_options())
+                config_dict['is_initial_commit'] = wizard.choose_bool(__name__, 'Commit generated files?')
             config_dict['project_name'] = wizard.get_data_and_valid(__name__, 'Enter project name', [''])
             config_dict['author'] = wizard.get_data_and_valid(__name__, 'Enter author', [''])
             config_dict['author_email'] = wizard.get_data_and_valid(__name__, 'Enter author email', [''])
@@ -166,5 +169,24 @@ def generate(args, cwd):
     prepare.generate_repo(config, cwd=repo_generator_cwd, options=args)
 
 
+def _get_clone_options():
+    clone_options = {}
+    
+    clone_strategy = wizard.choose_one(__name__, 'Select a GIT clone strategy', settings.CloneStrategy)
+    if clone_strategy == settings.CloneStrategy.PARTIAL.value:
+        clone_options['clone_filter'] = settings.PARTIAL_CLONE_FILTER
+    elif clone_strategy == settings.CloneStrategy.SHALLOW.value:
+        clone_depth = ''
+        while not clone_depth.isdigit() or int(clone_depth) < 1:
+            clone_depth = wizard.get_data(__name__, 'Enter a clone depth, a positive number of commits')
+        clone_options['clone_depth'] = int(clone_depth)
+    if clone_strategy != settings.CloneStrategy.FULL.value:
+        clone_options['clone_single_branch'] = wizard.choose_bool(__name__, 'Clone only the default branch?')
+    clone_options['clone_reference'] = wizard.get_data(__name__, 'Enter a path to a local reference repository '
+                                                       'or leave empty to not use it')
+    
+    return clone_options
+
+
 if __name__ == '__main__':
     main()
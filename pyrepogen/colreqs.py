@@ -2,47 +2,511 @@
 # -*- coding: utf-8 -*-
 
 
+import os
+import re
+import sys
+import ast
+import json
+import fnmatch
+import hashlib
+import functools
+import time
+import threading
+import http.client
+import urllib.parse
+import urllib.request
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pipreqs import pipreqs
+from packaging.requirements import Requirement, InvalidRequirement
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:
+    import importlib_metadata
 
 from . import settings
 from . import logger
 from . import prepare
 from . import wizard
 from . import clean
+from . import utils
+from . import exceptions
+from . import pygittools
 
 
 _logger = logger.get_logger(__name__)
 
 
-def collect_reqs_min(config, prompt=False, cwd='.'):
+def collect_reqs_min(config, prompt=False, cwd='.', cache_dir=None, root_dir=None):
     if prompt:
-        _prompt_and_clean(cwd)
-    reqs_equal = collect_reqs_specific(config, prompt=False, cwd=cwd)
+        _prompt_and_clean(root_dir or cwd)
+    reqs_equal = collect_reqs_specific(config, prompt=False, cwd=cwd, cache_dir=cache_dir, root_dir=root_dir)
     return _transform_to_min(reqs_equal)
 
 
-def collect_reqs_latest(config, prompt=False, cwd='.'):
+def collect_reqs_latest(config, prompt=False, cwd='.', cache_dir=None, root_dir=None):
     if prompt:
-        _prompt_and_clean(cwd)
-    reqs_equal = collect_reqs_specific(config, prompt=False, cwd=cwd)
+        _prompt_and_clean(root_dir or cwd)
+    reqs_equal = collect_reqs_specific(config, prompt=False, cwd=cwd, cache_dir=cache_dir, root_dir=root_dir)
     return _transform_to_latest(reqs_equal)
 
 
-def collect_reqs_specific(config, prompt=False, cwd='.'):
+def collect_reqs_specific(config, prompt=False, cwd='.', cache_dir=None, root_dir=None):
     if prompt:
-        _prompt_and_clean(cwd)
-    candidates = pipreqs.get_all_imports(str(cwd), extra_ignore_dirs=config.pipreqs_ignore)
-    candidates = pipreqs.get_pkg_names(candidates)
-    local = pipreqs.get_import_local(candidates)
-    difference = [x for x in candidates
-                  if x.lower() not in [z['name'].lower() for z in local]]
-    imports = local + pipreqs.get_imports_info(difference)
+        _prompt_and_clean(root_dir or cwd)
+    cache_dir = Path(cache_dir) if cache_dir else Path(cwd) / settings.DirName.REPOASSIST_CACHE
+    candidates = get_all_imports(cwd, extra_ignore_dirs=config.pipreqs_ignore,
+                                 cache_path=cache_dir / settings.FileName.IMPORTS_CACHE, root_path=root_dir)
+    
+    distributions_index = get_distributions_index()
+    pkg_names_mapping = _load_pkg_names_mapping()
+    local = {}
+    difference = set()
+    for candidate in candidates:
+        pkg_name = pkg_names_mapping.get(candidate, candidate)
+        distribution = _choose_distribution(candidate, pkg_name, distributions_index)
+        if distribution:
+            local[_canonicalize_name(distribution['name'])] = distribution
+        else:
+            difference.add(pkg_name)
+    
+    difference = [name for name in sorted(difference, key=str.lower) if _canonicalize_name(name) not in local]
+    imports = list(local.values()) + get_imports_info(difference, config)
     reqs = [f"{item['name']}=={item['version']}" for item in imports if 'INFO' not in item]
 
     return reqs
 
 
+def collect_reqs_lock(reqs):
+    _get_distribution_requirements.cache_clear()
+    pinned = {}
+    visited = set()
+    requirements_to_resolve = [Requirement(req) for req in reqs]
+    while requirements_to_resolve:
+        requirement = requirements_to_resolve.pop()
+        node = (_canonicalize_name(requirement.name), frozenset(requirement.extras))
+        if node in visited:
+            continue
+        visited.add(node)
+        
+        distribution = _get_distribution_requirements(node[0])
+        if distribution is None:
+            _logger.warning(f'Package {requirement.name} is not installed, its dependencies are not locked.')
+            pinned.setdefault(node[0], str(requirement))
+            continue
+        
+        name, version, dependencies = distribution
+        pinned[node[0]] = f'{name}=={version}'
+        environments = [{'extra': extra} for extra in requirement.extras] or [{'extra': ''}]
+        for dependency in dependencies:
+            if dependency.marker is None or \
+                    any(dependency.marker.evaluate(environment) for environment in environments):
+                requirements_to_resolve.append(dependency)
+    
+    return [pinned[name] for name in sorted(pinned)]
+
+
+@functools.lru_cache(maxsize=None)
+def _get_distribution_requirements(name):
+    try:
+        distribution = importlib_metadata.distribution(name)
+    except importlib_metadata.PackageNotFoundError:
+        return None
+    
+    dependencies = []
+    for requires_dist in distribution.requires or []:
+        try:
+            dependencies.append(Requirement(requires_dist))
+        except InvalidRequirement as e:
+            _logger.warning(f'Package {name} requirement {requires_dist} skipped: {e}')
+    
+    return distribution.metadata['Name'], distribution.version, tuple(dependencies)
+
+
+def get_all_imports(path, extra_ignore_dirs=None, cache_path=None, root_path=None):
+    ignore_dirs = set(settings.IMPORTS_SCAN_IGNORE_DIRS)
+    if extra_ignore_dirs:
+        ignore_dirs.update(os.path.basename(os.path.realpath(directory)) for directory in extra_ignore_dirs)
+    
+    local_names, files = _scan_source_files(str(path), ignore_dirs, str(root_path or path))
+    
+    cache = _load_imports_cache(cache_path) if cache_path else {}
+    entries = {}
+    files_to_parse = []
+    for file_path in files:
+        rel_path = os.path.relpath(file_path, path)
+        file_stat = os.stat(file_path)
+        entry = cache.get(rel_path)
+        if entry and not (entry['mtime_ns'] == file_stat.st_mtime_ns and entry['size'] == file_stat.st_size):
+            if entry.get('digest') != _get_file_digest(file_path):
+                entry = None
+        if entry:
+            entries[rel_path] = dict(entry, mtime_ns=file_stat.st_mtime_ns, size=file_stat.st_size)
+        else:
+            entries[rel_path] = {'mtime_ns': file_stat.st_mtime_ns, 'size': file_stat.st_size}
+            files_to_parse.append(file_path)
+    
+    try:
+        for file_path, (digest, file_imports) in zip(files_to_parse, _map_in_pool(_parse_imports, files_to_parse)):
+            entries[os.path.relpath(file_path, path)].update(digest=digest, imports=file_imports)
+    except (SyntaxError, ValueError) as e:
+        raise exceptions.RuntimeError(f'Imports discovery error: {e}', _logger)
+    
+    _logger.debug(f'Imports parsed from {len(files_to_parse)} of {len(files)} source files.')
+    if cache_path and (files_to_parse or entries != cache):
+        _save_imports_cache(entries, cache_path)
+    
+    raw_imports = set()
+    for entry in entries.values():
+        raw_imports.update(entry['imports'])
+    
+    imports = {name.partition('.')[0] for name in raw_imports if name}
+    with open(pipreqs.join('stdlib'), 'r') as file:
+        stdlib = {line.strip() for line in file}
+    
+    return sorted(imports - local_names - stdlib)
+
+
+def _scan_source_files(path, ignore_dirs, root_path):
+    path = os.path.normpath(path)
+    root_path = os.path.normpath(root_path)
+    ignored_paths = _get_git_ignored_paths(path)
+    root_patterns = [dir_to_clean['name'] for dir_to_clean in settings.DIRS_TO_CLEAN]
+    recursive_patterns = [dir_to_clean['name'] for dir_to_clean in settings.DIRS_TO_CLEAN 
+                          if dir_to_clean['flag'] == 'r']
+    local_names = set()
+    files = []
+    
+    dirs_to_scan = [path]
+    while dirs_to_scan:
+        directory = dirs_to_scan.pop()
+        local_names.add(os.path.basename(directory))
+        patterns = root_patterns if directory == root_path else recursive_patterns
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.path in ignored_paths:
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if not _is_dir_excluded(entry, ignore_dirs, patterns):
+                        dirs_to_scan.append(entry.path)
+                elif entry.is_file():
+                    name, extension = os.path.splitext(entry.name)
+                    if extension in settings.IMPORTS_SCAN_EXTENSIONS:
+                        local_names.add(name)
+                        files.append(entry.path)
+    
+    return local_names, files
+
+
+def _is_dir_excluded(entry, ignore_dirs, patterns):
+    if entry.name in ignore_dirs or any(fnmatch.fnmatch(entry.name, pattern) for pattern in patterns):
+        return True
+    
+    return os.path.exists(os.path.join(entry.path, settings.VIRTUALENV_CFG))
+
+
+def _get_git_ignored_paths(path):
+    try:
+        return {os.path.join(path, os.path.normpath(ignored_path)) 
+                for ignored_path in pygittools.get_ignored_paths(path)}
+    except pygittools.PygittoolsError:
+        return set()
+
+
+def _parse_imports(file_path):
+    with open(file_path, 'rb') as file:
+        content = file.read()
+    digest = hashlib.sha256(content).hexdigest()
+    
+    if b'import' not in content:
+        return digest, []
+    
+    imports = set()
+    for node in ast.walk(ast.parse(content, filename=file_path)):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            imports.add(node.module)
+    
+    return digest, sorted(imports)
+
+
+def _get_file_digest(file_path):
+    with open(file_path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def _load_imports_cache(cache_path):
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    
+    if not isinstance(cache, dict) or cache.get('version') != settings.IMPORTS_CACHE_VERSION:
+        return {}
+    
+    return cache.get('files', {})
+
+
+def _save_imports_cache(entries, cache_path):
+    try:
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        temp_path = Path(cache_path).with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump({'version': settings.IMPORTS_CACHE_VERSION, 'files': entries}, file)
+        temp_path.replace(cache_path)
+    except OSError as e:
+        _logger.warning(f'Imports cache saving error: {e}')
+
+
+def _map_in_pool(func, items):
+    workers = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    if workers < 2 or len(items) < settings.IMPORTS_SCAN_PARALLEL_MIN_FILES:
+        return [func(item) for item in items]
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, items, chunksize=max(1, len(items) // (workers * 4))))
+
+
+def get_distributions_index(cache_path=None):
+    cache_path = Path(cache_path) if cache_path else \
+        utils.get_user_cache_dir() / settings.FileName.DISTRIBUTIONS_CACHE
+    signature = _get_site_packages_signature()
+    
+    cache = _load_json_cache(cache_path)
+    cached_index = cache.get(sys.executable)
+    if cached_index and cached_index.get('signature') == signature:
+        return cached_index['index']
+    
+    index = {'imports': {}, 'distributions': {}}
+    for distribution in importlib_metadata.distributions():
+        name = distribution.metadata['Name']
+        if not name or _canonicalize_name(name) in index['distributions']:
+            continue
+        entry = {'name': name, 'version': distribution.version}
+        index['distributions'][_canonicalize_name(name)] = entry
+        for top_level in _get_top_level_names(distribution):
+            index['imports'].setdefault(top_level, []).append(entry)
+    
+    cache[sys.executable] = {'signature': signature, 'index': index}
+    _save_json_cache(cache, cache_path)
+    _logger.debug(f'Index of {len(index["distributions"])} installed distributions built.')
+    
+    return index
+
+
+def _choose_distribution(import_name, pkg_name, distributions_index):
+    distributions = distributions_index['imports'].get(import_name)
+    if not distributions:
+        return distributions_index['distributions'].get(_canonicalize_name(pkg_name))
+    if len(distributions) == 1:
+        return distributions[0]
+    
+    for distribution in distributions:
+        if _canonicalize_name(distribution['name']) == _canonicalize_name(pkg_name):
+            return distribution
+    for distribution in distributions:
+        if _is_top_level_owner(distribution['name'], import_name):
+            return distribution
+    
+    distribution = sorted(distributions, key=lambda item: _canonicalize_name(item['name']))[0]
+    _logger.warning(f'Import {import_name} is provided by several distributions '
+                    f'({", ".join(item["name"] for item in distributions)}), {distribution["name"]} chosen.')
+    return distribution
+
+
+def _is_top_level_owner(distribution_name, import_name):
+    try:
+        files = importlib_metadata.distribution(distribution_name).files or []
+    except importlib_metadata.PackageNotFoundError:
+        return False
+    
+    for file_path in files:
+        parts = file_path.parts
+        if parts == (import_name, '__init__.py') or \
+                (len(parts) == 1 and parts[0].partition('.')[0] == import_name and 
+                 file_path.suffix in settings.IMPORTS_SCAN_EXTENSIONS + ['.so', '.pyd']):
+            return True
+    
+    return False
+
+
+def _get_site_packages_signature():
+    signature = {}
+    for path in sys.path:
+        try:
+            signature[path] = os.stat(path or '.').st_mtime_ns
+        except OSError:
+            continue
+    
+    return signature
+
+
+def _get_top_level_names(distribution):
+    top_level_txt = distribution.read_text('top_level.txt')
+    if top_level_txt:
+        names = {name.strip().replace('/', '.').partition('.')[0] for name in top_level_txt.splitlines()}
+    else:
+        names = set()
+        for file_path in distribution.files or []:
+            top_part = file_path.parts[0] if file_path.parts else ''
+            if not top_part or top_part in ('..', '__pycache__') or \
+                    any(top_part.endswith(suffix) for suffix in settings.DISTRIBUTIONS_METADATA_SUFFIXES):
+                continue
+            if len(file_path.parts) == 1:
+                if file_path.suffix not in settings.IMPORTS_SCAN_EXTENSIONS + ['.so', '.pyd']:
+                    continue
+                top_part = top_part.partition('.')[0]
+            names.add(top_part)
+    
+    return sorted(name for name in names if name and name not in settings.DISTRIBUTIONS_IGNORED_TOP_LEVEL)
+
+
+def _load_pkg_names_mapping():
+    with open(pipreqs.join('mapping'), 'r') as file:
+        return dict(line.strip().split(':') for line in file if ':' in line)
+
+
+def _canonicalize_name(name):
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def get_imports_info(names, config, cache_path=None):
+    cache_path = Path(cache_path) if cache_path else utils.get_user_cache_dir() / settings.FileName.PYPI_CACHE
+    index_url = config.pypi_index_url or settings.PYPI_INDEX_URL
+    ttl_hours = settings.PYPI_CACHE_TTL_HOURS if config.pypi_cache_ttl in (None, '') else config.pypi_cache_ttl
+    cache = _load_json_cache(cache_path)
+    index_cache = cache.setdefault(index_url, {})
+    
+    imports_info = []
+    names_to_fetch = []
+    for name in names:
+        entry = index_cache.get(name.lower())
+        if entry and (config.pypi_offline or time.time() - entry['time'] < float(ttl_hours) * 3600):
+            if entry['version']:
+                imports_info.append({'name': name, 'version': entry['version']})
+        else:
+            names_to_fetch.append(name)
+    
+    if config.pypi_offline:
+        for name in names_to_fetch:
+            _logger.warning(f'Package {name} not found locally nor in the cache. Skipped in offline mode.')
+        return imports_info
+    
+    for name in names_to_fetch:
+        _logger.info(f'Package {name} not found locally. Resolving it at {index_url}')
+    
+    for name, future in zip(names_to_fetch, _fetch_latest_versions(index_url, names_to_fetch)):
+        try:
+            version = future.result()
+        except (http.client.HTTPException, OSError, ValueError, KeyError) as e:
+            _logger.warning(f'Package {name} resolving error: {e}')
+            continue
+        
+        index_cache[name.lower()] = {'version': version, 'time': time.time()}
+        if version:
+            imports_info.append({'name': name, 'version': version})
+        else:
+            _logger.warning(f'Package {name} does not exist at {index_url}')
+    
+    if names_to_fetch:
+        _save_json_cache(cache, cache_path)
+    
+    return imports_info
+
+
+def _fetch_latest_versions(index_url, names):
+    if not names:
+        return []
+    
+    connections = []
+    thread_data = threading.local()
+    
+    def _fetch(name):
+        if not hasattr(thread_data, 'connection'):
+            thread_data.connection = _open_index_connection(index_url)
+            connections.append(thread_data.connection)
+        return _fetch_latest_version(*thread_data.connection, name)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=min(settings.PYPI_MAX_CONNECTIONS, len(names))) as executor:
+            futures = [executor.submit(_fetch, name) for name in names]
+    finally:
+        for connection, _ in connections:
+            connection.close()
+    
+    return futures
+
+
+def _open_index_connection(index_url):
+    url = urllib.parse.urlsplit(index_url)
+    connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+    base_path = url.path.rstrip('/')
+    
+    proxy = urllib.request.getproxies().get(url.scheme)
+    if proxy and not urllib.request.proxy_bypass(url.hostname):
+        proxy_url = urllib.parse.urlsplit(proxy if '://' in proxy else f'http://{proxy}')
+        connection = connection_class(proxy_url.hostname, proxy_url.port, timeout=settings.PYPI_REQUEST_TIMEOUT)
+        if url.scheme == 'https':
+            connection.set_tunnel(url.hostname, url.port)
+        else:
+            base_path = f'{url.scheme}://{url.netloc}{base_path}'
+    else:
+        connection = connection_class(url.hostname, url.port, timeout=settings.PYPI_REQUEST_TIMEOUT)
+    
+    return connection, base_path
+
+
+def _fetch_latest_version(connection, base_path, name):
+    path = f'{base_path}/{urllib.parse.quote(name)}/json'
+    attempt = 0
+    redirects = 0
+    while True:
+        try:
+            connection.request('GET', path, headers={'Accept': 'application/json'})
+            response = connection.getresponse()
+            content = response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            if attempt >= settings.PYPI_REQUEST_RETRIES:
+                raise
+        else:
+            if response.status == 200:
+                return json.loads(content.decode('utf-8'))['info']['version']
+            if response.status == 404:
+                return None
+            if response.status in (301, 302, 303, 307, 308) and response.getheader('Location') and \
+                    redirects < settings.PYPI_MAX_REDIRECTS:
+                redirects += 1
+                path = urllib.parse.urlsplit(response.getheader('Location')).path
+                continue
+            if response.status < 500 or attempt >= settings.PYPI_REQUEST_RETRIES:
+                raise ValueError(f'HTTP error {response.status}: {response.reason}')
+        
+        time.sleep(settings.PYPI_RETRY_BACKOFF * 2 ** attempt)
+        attempt += 1
+
+
+def _load_json_cache(cache_path):
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_json_cache(cache, cache_path):
+    try:
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        temp_path = Path(cache_path).with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(cache, file)
+        temp_path.replace(cache_path)
+    except OSError as e:
+        _logger.warning(f'Cache {cache_path} saving error: {e}')
+
+
 def _prompt_and_clean(cwd='.'):
     if wizard.choose_bool(__name__,
                           'Run cleaner to clean generated directories? '
@@ -88,6 +552,22 @@ def write_requirements_dev(cwd='.'):
     return file_path
 
 
+def write_requirements_lock(reqs, cwd='.'):
+    file_path = Path(cwd) / settings.FileName.REQUIREMENTS_LOCK
+    file_exists = file_path.exists()
+    
+    with open(file_path, 'w') as file:
+        for req in reqs:
+            file.write(f'{req}\n')
+    
+    if file_exists:
+        _logger.info(f'{settings.FileName.REQUIREMENTS_LOCK} file updated.')
+    else:
+        _logger.info(f'{settings.FileName.REQUIREMENTS_LOCK} file prepared.')
+    
+    return file_path
+
+
 def _transform_to_min(reqs):
     final_reqs = []
     for req in reqs:
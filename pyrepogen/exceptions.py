@@ -12,6 +12,12 @@ class ExecuteCmdError(PyRepoGenError):
         super().__init__(msg, logger)
         self.returncode = returncode
         self.logger = logger
+
+class ExecuteCmdTimeoutError(ExecuteCmdError):
+    pass
+
+class ExecuteCmdCancelledError(ExecuteCmdError):
+    pass
         
         
 class CriticalError(PyRepoGenError):
@@ -83,5 +89,8 @@ class GitAddError(PyRepoGenError):
 class GitRemoveError(PyRepoGenError):
     pass
 
+class GitCommitError(PyRepoGenError):
+    pass
+
 class RepoassistNotFoundError(PyRepoGenError):
     pass
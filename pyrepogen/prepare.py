@@ -44,7 +44,15 @@ def generate_repo(config, cwd='.', options=None):
         raise exceptions.RuntimeError('Unknown project type.', _logger)
     paths.extend(_generate_repoasist(config, cwd, options).paths)
     
-    if config.is_git:
+    if config.is_git and config.is_initial_commit:
+        try:
+            pygittools.commit_untracked_files(paths, settings.INITIAL_COMMIT_MSG, 
+                                              config.author, config.author_email, cwd)
+        except pygittools.PygittoolsError as e:
+            raise exceptions.GitCommitError(f'Error occured while committing generated files: {e}', _logger)
+
+        _logger.info('Generated files committed into repository.')
+    elif config.is_git:
         for path in paths:
             try:
                 pygittools.add(path, cwd)
@@ -64,7 +72,11 @@ def generate_repo(config, cwd='.', options=None):
 def _init_git_repo(config, cwd):
     if config.git_origin:
         try:
-            pygittools.clone(config.git_origin, cwd.parent)
+            pygittools.clone(config.git_origin, cwd.parent,
+                             depth=int(config.clone_depth) if config.clone_depth else None,
+                             filter_spec=config.clone_filter,
+                             single_branch=config.clone_single_branch,
+                             reference=config.clone_reference)
         except pygittools.PygittoolsError as e:
             raise exceptions.RuntimeError(f'Git repository clone error: {e}', _logger)
     else:
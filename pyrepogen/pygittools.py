@@ -4,14 +4,26 @@
 
 import os
 import re
+import time
+import stat
 import inspect
 import subprocess
 from pathlib import Path
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
 __version__ = '0.1.0'
 
 GIT_SSH_COMMAND = 'GIT_SSH_COMMAND'
+COMMIT_GRAPH_PATHS = ['objects/info/commit-graph', 'objects/info/commit-graphs/commit-graph-chain']
+PACKS_PATH = 'objects/pack'
+MULTI_PACK_INDEX_FILENAME = 'multi-pack-index'
+REFS_PATHS = ['HEAD', 'logs/HEAD', 'packed-refs', 'refs/heads', 'refs/tags']
+
+
+SubmoduleResult = namedtuple('SubmoduleResult', 'path returncode output')
+SubmoduleStatus = namedtuple('SubmoduleStatus', 'path commit branch is_dirty is_initialized')
 
 
 class PygittoolsError(Exception):
@@ -64,8 +76,19 @@ def init(cwd='.'):
     return _execute_cmd(['git', 'init'], cwd=cwd)
 
 
-def clone(url, cwd='.'):
-    return _execute_cmd(['git', 'clone', str(url)], cwd=cwd)
+def clone(url, cwd='.', depth=None, filter_spec=None, single_branch=False, reference=None):
+    cmd = ['git', 'clone']
+    if depth:
+        cmd.extend(['--depth', str(depth)])
+    if filter_spec:
+        cmd.append(f'--filter={filter_spec}')
+    if single_branch:
+        cmd.append('--single-branch')
+    if reference:
+        cmd.extend(['--reference', Path(reference).resolve().as_posix()])
+    cmd.append(str(url))
+    
+    return _execute_cmd(cmd, cwd=cwd)
 
 
 @check_work_tree
@@ -111,6 +134,26 @@ def commit(msg, cwd='.'):
     return _execute_cmd(['git', 'commit', '-m', msg], cwd=cwd)
 
 
+@check_work_tree
+def commit_untracked_files(paths, msg, author, author_email, cwd='.'):
+    files = _execute_cmd(['git', 'ls-files', '--others', '--modified', '--exclude-standard', '-z', '--']
+                         + [Path(path).as_posix() for path in paths], cwd=cwd).split('\0')
+    files = sorted(set(file for file in files if file))
+    if not files:
+        raise ValueError('No files to commit.', returncode=1)
+    
+    branch_ref = _execute_cmd(['git', 'symbolic-ref', 'HEAD'], cwd=cwd)
+    try:
+        parent = _execute_cmd(['git', 'rev-parse', '-q', '--verify', 'HEAD'], cwd=cwd)
+    except CmdError:
+        parent = None
+
+    stream = _get_fast_import_stream(files, msg, f'{author} <{author_email}>', branch_ref, parent, cwd)
+    _execute_cmd_with_input(['git', 'fast-import', '--quiet', '--done'], stream, cwd=cwd)
+    
+    return _execute_cmd(['git', 'reset', '-q', '--mixed'], cwd=cwd)
+
+
 @check_work_tree
 def push(ssh_key=None, cwd='.'):
     return _execute_cmd(['git', 'push'], ssh_key=ssh_key, cwd=cwd)
@@ -148,8 +191,12 @@ def revert(commit_rollback, cwd='.'):
 
 
 @check_work_tree
-def get_latest_tag(cwd='.'):
-    return _execute_cmd(['git', 'describe', '--abbrev=0', '--tags'], cwd=cwd)
+def get_latest_tag(cwd='.', tag_prefix=None):
+    cmd = ['git', 'describe', '--abbrev=0', '--tags']
+    if tag_prefix:
+        cmd.extend(['--match', f'{tag_prefix}*'])
+
+    return _execute_cmd(cmd, cwd=cwd)
 
 
 @check_work_tree
@@ -187,8 +234,12 @@ def set_tag(tag, msg, cwd='.'):
     
 
 @check_work_tree
-def list_tags(cwd='.'):
-    return list(filter(None, _execute_cmd(['git', 'tag'], cwd=cwd).split('\n')))
+def list_tags(cwd='.', tag_prefix=None):
+    cmd = ['git', 'tag', '--list']
+    if tag_prefix:
+        cmd.append(f'{tag_prefix}*')
+
+    return list(filter(None, _execute_cmd(cmd, cwd=cwd).split('\n')))
 
 
 @check_work_tree
@@ -212,6 +263,16 @@ def is_any_commit(cwd='.'):
         return True
 
 
+@check_work_tree
+def is_shallow_repo(cwd='.'):
+    return _execute_cmd(['git', 'rev-parse', '--is-shallow-repository'], cwd=cwd).lower() == 'true'
+
+
+@check_work_tree
+def fetch_unshallow(ssh_key=None, cwd='.'):
+    return _execute_cmd(['git', 'fetch', '--unshallow', '--tags', '-q'], ssh_key=ssh_key, cwd=cwd)
+
+
 @check_work_tree
 def is_any_tag(cwd='.'):
     return list_tags(cwd).__len__() > 0
@@ -263,19 +324,29 @@ def get_latest_commit_hash(cwd='.'):
     return _execute_cmd(["git", "log", "--pretty=format:%h", "-n", "1"], cwd=cwd)
 
 
+@check_work_tree
+def get_commit_timestamp(rev='HEAD', cwd='.'):
+    return int(_execute_cmd(['git', 'log', '-1', '--format=%ct', rev], cwd=cwd))
+
+
+@check_work_tree
+def get_tree_hash(rev='HEAD', cwd='.'):
+    return _execute_cmd(['git', 'rev-parse', f'{rev}:./'], cwd=cwd)
+
+
 @check_work_tree
 def get_tag_commit_hash(tag, cwd='.'):
     return _execute_cmd(["git", "log", "--pretty=format:%h", "-n", "1", tag], cwd=cwd)
 
 
 @check_work_tree
-def get_changelog(report_format=None, cwd='.'):
+def get_changelog(report_format=None, cwd='.', tag_prefix=None):
     if not report_format:
         report_format = "%(taggerdate:short) | Release: %(tag) \r\n%(contents)"
         
     return _execute_cmd(["git", "for-each-ref", "--sort=-creatordate",
                                "--format={}".format(report_format),
-                               "refs/tags"], cwd=cwd)
+                               f"refs/tags/{tag_prefix}*" if tag_prefix else "refs/tags"], cwd=cwd)
 
 
 @check_work_tree
@@ -289,8 +360,58 @@ def init_submodule(cwd='.'):
 
 
 @check_work_tree
-def update_all_submodules(ssh_key=None, cwd='.'):
-    return _execute_cmd(["git", "submodule", "update", "--recursive", "--remote"], ssh_key=ssh_key, cwd=cwd)
+def update_all_submodules(ssh_key=None, cwd='.', jobs=None):
+    cmd = ["git", "submodule", "update", "--recursive", "--remote"]
+    if jobs:
+        cmd.extend(["--jobs", str(jobs)])
+    
+    return _execute_cmd(cmd, ssh_key=ssh_key, cwd=cwd)
+
+
+@check_work_tree
+def set_submodule_fetch_jobs(jobs, cwd='.'):
+    return _execute_cmd(["git", "config", "submodule.fetchJobs", str(jobs)], cwd=cwd)
+
+
+@check_work_tree
+def list_submodules(cwd='.'):
+    try:
+        paths = _execute_cmd(["git", "config", "-f", ".gitmodules", "--get-regexp", r"^submodule\..*\.path$"], cwd=cwd)
+    except CmdError:
+        return []
+    
+    return [line.split(' ', 1)[1] for line in paths.splitlines() if line]
+
+
+@check_work_tree
+def update_submodules(paths=None, jobs=None, progress=None, ssh_key=None, cwd='.'):
+    def update_submodule(path):
+        try:
+            output = _execute_cmd(["git", "submodule", "update", "--recursive", "--remote", "--", path],
+                                  ssh_key=ssh_key, cwd=cwd)
+        except CmdError as e:
+            return SubmoduleResult(path, e.returncode, str(e))
+        else:
+            return SubmoduleResult(path, 0, output)
+    
+    paths = list_submodules(cwd) if paths is None else [Path(path).as_posix() for path in paths]
+    return _run_for_submodules(update_submodule, paths, jobs, progress)
+
+
+@check_work_tree
+def get_submodules_status(paths=None, jobs=None, progress=None, cwd='.'):
+    def get_submodule_status(path):
+        if not (Path(cwd) / path / '.git').exists():
+            return SubmoduleStatus(path, None, None, False, False)
+        
+        status = _execute_cmd(["git", "status", "--porcelain=v2", "--branch"], cwd=Path(cwd) / path).splitlines()
+        headers = dict(line[2:].split(' ', 1) for line in status if line.startswith('# '))
+        is_dirty = any(not line.startswith('#') for line in status)
+        
+        return SubmoduleStatus(path, headers.get('branch.oid'), headers.get('branch.head'), is_dirty, True)
+    
+    paths = list_submodules(cwd) if paths is None else [Path(path).as_posix() for path in paths]
+    return _run_for_submodules(get_submodule_status, paths, jobs, progress)
 
 
 @check_work_tree
@@ -310,29 +431,31 @@ def clear_cache(path, cwd='.'):
 
 
 @check_work_tree
-def get_commit_msgs_from_last_tag(cwd='.'):
+def get_commit_msgs_from_last_tag(cwd='.', paths=None, tag_prefix=None):
+    pathspec = _get_pathspec(paths)
     try:
-        latest_tag = get_latest_tag(cwd)
-        msg_list = _execute_cmd(['git', 'log', '--pretty=%B', f'{latest_tag}..HEAD'], cwd=cwd).split('\n')
+        latest_tag = get_latest_tag(cwd, tag_prefix=tag_prefix)
+        msg_list = _execute_cmd(['git', 'log', '--pretty=%B', f'{latest_tag}..HEAD'] + pathspec, cwd=cwd).split('\n')
     except PygittoolsError:
-        msg_list = _execute_cmd(['git', 'log', '--pretty=%B', 'HEAD'], cwd=cwd).split('\n')
+        msg_list = _execute_cmd(['git', 'log', '--pretty=%B', 'HEAD'] + pathspec, cwd=cwd).split('\n')
     msg_list.reverse()
 
     return '\n'.join(msg_list)
 
 
 @check_work_tree
-def get_authors(cwd='.'):
+def get_authors(cwd='.', paths=None):
     ignore_emails = '((jenkins|zuul)@review|infra@lists|jenkins@openstack)'
+    pathspec = _get_pathspec(paths)
     
     try:
-        authors = _execute_cmd(['git', 'log', '--format=%aN <%aE>'], cwd=cwd).split('\n')
+        authors = _execute_cmd(['git', 'log', '--format=%aN <%aE>'] + pathspec, cwd=cwd).split('\n')
     except CmdError:
         raise NoAuthorsError('No authors found.', returncode=1)
     else:
         authors = [a for a in authors if not re.search(ignore_emails, a)]
     
-        co_authors_out = _execute_cmd(['git', 'log'], cwd=cwd)
+        co_authors_out = _execute_cmd(['git', 'log'] + pathspec, cwd=cwd)
         co_authors = re.findall('Co-authored-by:.+', co_authors_out,
                                 re.MULTILINE)
         co_authors = [signed.split(":", 1)[1].strip()
@@ -344,6 +467,118 @@ def get_authors(cwd='.'):
     return authors
 
 
+@check_work_tree
+def get_repo_root(cwd='.'):
+    return Path(_execute_cmd(['git', 'rev-parse', '--show-toplevel'], cwd=cwd)).resolve()
+
+
+@check_work_tree
+def get_ignored_paths(cwd='.'):
+    paths = _execute_cmd(['git', 'ls-files', '--others', '--ignored', '--exclude-standard', '--directory', '-z'], 
+                         cwd=cwd).split('\0')
+    return [path.rstrip('/') for path in paths if path]
+
+
+@check_work_tree
+def get_git_dir(cwd='.'):
+    return Path(_execute_cmd(['git', 'rev-parse', '--absolute-git-dir'], cwd=cwd))
+
+
+@check_work_tree
+def get_git_path(path, cwd='.'):
+    return Path(cwd).resolve() / _execute_cmd(['git', 'rev-parse', '--git-path', Path(path).as_posix()], cwd=cwd)
+
+
+@check_work_tree
+def get_commits_count(cwd='.'):
+    return int(_execute_cmd(['git', 'rev-list', '--count', '--all'], cwd=cwd))
+
+
+@check_work_tree
+def is_commit_graph_stale(cwd='.'):
+    graph_paths = [get_git_path(path, cwd) for path in COMMIT_GRAPH_PATHS]
+    graph_mtimes = [path.stat().st_mtime for path in graph_paths if path.exists()]
+    if not graph_mtimes:
+        return True
+
+    return max(graph_mtimes) < _get_refs_mtime(cwd)
+
+
+@check_work_tree
+def write_commit_graph(cwd='.'):
+    return _execute_cmd(['git', 'commit-graph', 'write', '--reachable', '--split'], cwd=cwd)
+
+
+@check_work_tree
+def is_multi_pack_index_stale(cwd='.'):
+    packs_dir = get_git_path(PACKS_PATH, cwd)
+    packs_mtimes = [path.stat().st_mtime for path in packs_dir.glob('*.pack')]
+    if packs_mtimes.__len__() < 2:
+        return False
+
+    midx_path = packs_dir / MULTI_PACK_INDEX_FILENAME
+    if not midx_path.exists():
+        return True
+
+    return midx_path.stat().st_mtime < max(packs_mtimes)
+
+
+@check_work_tree
+def write_multi_pack_index(cwd='.'):
+    return _execute_cmd(['git', 'multi-pack-index', 'write'], cwd=cwd)
+
+
+def _run_for_submodules(func, paths, jobs=None, progress=None):
+    results = {}
+    
+    with ThreadPoolExecutor(max_workers=jobs or None) as executor:
+        futures = [executor.submit(func, path) for path in paths]
+        for future in as_completed(futures):
+            result = future.result()
+            results[result.path] = result
+            if progress:
+                progress(result, results.__len__(), paths.__len__())
+    
+    return [results[path] for path in paths]
+
+
+def _get_pathspec(paths):
+    if not paths:
+        return []
+
+    return ['--'] + [Path(path).as_posix() for path in paths]
+
+
+def _get_refs_mtime(cwd='.'):
+    refs_paths = [get_git_path(path, cwd) for path in REFS_PATHS]
+    return max([path.stat().st_mtime for path in refs_paths if path.exists()], default=0)
+
+
+def _get_fast_import_stream(files, msg, ident, branch_ref, parent=None, cwd='.'):
+    def data(content):
+        return b'data %d\n' % content.__len__() + content + b'\n'
+    
+    utc_offset = time.localtime().tm_gmtoff // 60
+    utc_offset_sign = '-' if utc_offset < 0 else '+'
+    ident_line = f'{ident} {int(time.time())} {utc_offset_sign}{abs(utc_offset) // 60:02}{abs(utc_offset) % 60:02}'
+    stream = [f'commit {branch_ref}\nauthor {ident_line}\ncommitter {ident_line}\n'.encode('utf-8'),
+              data(msg.encode('utf-8'))]
+    if parent:
+        stream.append(f'from {parent}\n'.encode('utf-8'))
+    
+    for file in files:
+        path = Path(cwd) / file
+        if not path.exists():
+            stream.append(f'D {file}\n'.encode('utf-8'))
+            continue
+        mode = '100755' if os.name != 'nt' and path.stat().st_mode & stat.S_IXUSR else '100644'
+        stream.append(f'M {mode} inline {file}\n'.encode('utf-8'))
+        stream.append(data(path.read_bytes()))
+    stream.append(b'\ndone\n')
+    
+    return b''.join(stream)
+
+
 def _execute_cmd(args, ssh_key=None, cwd='.'):
     cwd = Path(cwd).resolve()
     if not cwd.exists():
@@ -367,3 +602,16 @@ def _execute_cmd(args, ssh_key=None, cwd='.'):
         return process.stdout.strip()
     except subprocess.CalledProcessError as e:
         raise CmdError(e.output, returncode=e.returncode)
+
+
+def _execute_cmd_with_input(args, input_data, cwd='.'):
+    try:
+        process = subprocess.run(args,
+                                 check=True,
+                                 cwd=Path(cwd).resolve().__str__(),
+                                 input=input_data,
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT)
+        return process.stdout.decode('utf-8').strip()
+    except subprocess.CalledProcessError as e:
+        raise CmdError(e.output.decode('utf-8', errors='replace'), returncode=e.returncode)
@@ -5,8 +5,26 @@
 import os
 import re
 import sys
+import json
+import shutil
+import time
+import atexit
+import signal
+import mmap
+import hashlib
+import platform
+import fnmatch
+import tempfile
+import threading
+import collections
+import subprocess
 from pathlib import Path
 from enum import Enum
+from concurrent.futures import ThreadPoolExecutor, wait
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:
+    import importlib_metadata
 
 from . import settings
 from . import utils
@@ -21,6 +39,43 @@ _logger = logger.get_logger(__name__)
 
 _VERSION_REGEX = r"__version__ *= *['|\"]\S+"
 
+_HOOK_RUNNER = '''
+import os, sys, json, importlib, traceback
+protocol = os.fdopen(os.dup(1), 'w')
+os.dup2(2, 1)
+sys.stdout = sys.stderr
+module_name, _, object_path = sys.argv[1].partition(':')
+sys.path[:0] = json.loads(sys.argv[2])
+backend = importlib.import_module(module_name)
+for name in filter(None, object_path.split('.')):
+    backend = getattr(backend, name)
+def call_hook(request):
+    os.chdir(request['cwd'])
+    os.environ.update(request['env'])
+    try:
+        response = {'result': getattr(backend, request['hook'])(*request['args'])}
+    except BaseException:
+        response = {'error': traceback.format_exc()}
+    sys.stderr.flush()
+    protocol.write(json.dumps(response) + chr(10))
+    protocol.flush()
+for line in sys.stdin:
+    request = json.loads(line)
+    if not hasattr(os, 'fork'):
+        call_hook(request)
+        continue
+    pid = os.fork()
+    if pid == 0:
+        call_hook(request)
+        os._exit(0)
+    if os.waitpid(pid, 0)[1] != 0:
+        protocol.write(json.dumps({'error': 'Build backend process crashed.'}) + chr(10))
+        protocol.flush()
+'''
+
+_hook_runners = {}
+_files_sha256 = {}
+
 
 class ReleaseAction(Enum):
     MAKE_RELEASE = 'rel'
@@ -34,14 +89,22 @@ def make_install(options=None, cwd='.'):
         reltools.check_repo_tree(cwd)
         reltools.check_if_changes_to_commit(cwd)
     
+    config = utils.get_repo_config_from_setup_cfg(Path(cwd) / settings.FileName.SETUP_CFG)
+    reltools.complete_shallow_history(cwd)
+    
     try:
-        release_tag = pygittools.get_latest_tag(cwd)
+        release_tag = pygittools.get_latest_tag(cwd, tag_prefix=config.tag_prefix)
     except pygittools.PygittoolsError as e:
         raise exceptions.ReleaseMetadataError(f"Retrieving release tag error: {e}", _logger)
 
-    final_release_tag = _get_final_release_tag(release_tag, cwd)
+    final_release_tag = reltools.strip_tag_prefix(_get_final_release_tag(release_tag, cwd), config.tag_prefix)
+    wheel_path = _find_dist_wheel(config, final_release_tag, cwd)
+    if wheel_path:
+        _logger.info(f'Wheel {utils.get_rel_path(wheel_path, cwd)} reused.')
+    else:
+        _, wheel_path = _prepare_distributions(config, release_tag, final_release_tag, cwd)
     
-    _run_setup_cmd(['install'], release_tag=final_release_tag, cwd=cwd)
+    _install_wheel(wheel_path, cwd=cwd)
     
     _logger.info('Installation completed.')
     
@@ -55,18 +118,26 @@ def make_release(action=ReleaseAction.REGENERATE, prompt=True, push=True, releas
     
     release_files_paths = []
     config = utils.get_repo_config_from_setup_cfg(Path(cwd) / settings.FileName.SETUP_CFG)
+    reltools.complete_shallow_history(cwd)
+    
+    if config.large_repo:
+        reltools.refresh_history_indexes(cwd)
+        
+    history_scope = _get_history_scope(config, cwd)
 
     if prompt:
         action = _release_checkout(config)
         if action == ReleaseAction.MAKE_RELEASE:
-            new_release_tag = reltools.prompt_release_tag(reltools.TagType.PYTHON, cwd)
-            new_release_msg = reltools.prompt_release_msg(cwd)
+            new_release_tag = reltools.prompt_release_tag(reltools.TagType.PYTHON, cwd, 
+                                                          tag_prefix=config.tag_prefix)
+            new_release_msg = reltools.prompt_release_msg(cwd, paths=history_scope, tag_prefix=config.tag_prefix)
     else:
         if action == ReleaseAction.MAKE_RELEASE:
             new_release_tag = release_data.tag
             new_release_msg = release_data.msg
             
     if action == ReleaseAction.MAKE_RELEASE:
+        new_release_tag_name = f'{config.tag_prefix}{new_release_tag}'
         files_to_add = [_update_project_version(config, new_release_tag, cwd)]
         changelog_type = _get_reltools_changelog_type(config)
         changelog_generated_template_path = (Path(__file__).parent / settings.DirName.TEMPLATES 
@@ -82,62 +153,478 @@ def make_release(action=ReleaseAction.REGENERATE, prompt=True, push=True, releas
         files_to_add.append(reltools.update_changelog(changelog_type, 
                                                       settings.FileName.CHANGELOG, 
                                                       config.__dict__, 
-                                                      new_release_tag, 
+                                                      new_release_tag_name, 
                                                       new_release_msg, 
                                                       changelog_generated_template_path=changelog_generated_template_path, 
                                                       changelog_prepared_template_path=changelog_prepared_template_path, 
-                                                      cwd=cwd))
+                                                      cwd=cwd,
+                                                      tag_prefix=config.tag_prefix))
         files_to_add.append(reltools.update_authors(authors_type, 
                                                     settings.FileName.AUTHORS, 
                                                     config.__dict__, 
                                                     authors_generated_template_path, 
                                                     authors_prepared_template_path, 
-                                                    cwd))
+                                                    cwd,
+                                                    paths=history_scope))
 
-        release_files_paths.extend(reltools.commit_and_push_release_update(new_release_tag, 
+        release_files_paths.extend(reltools.commit_and_push_release_update(new_release_tag_name, 
                                                                            new_release_msg, 
                                                                            files_to_add=files_to_add, 
                                                                            push=push, 
                                                                            cwd=cwd,
-                                                                           prompt=prompt))
-        release_tag = new_release_tag
+                                                                           prompt=prompt,
+                                                                           tag_prefix=config.tag_prefix))
+        release_tag = new_release_tag_name
         
     elif action == ReleaseAction.REGENERATE:
         try:
-            release_tag = pygittools.get_latest_tag(cwd)
+            release_tag = pygittools.get_latest_tag(cwd, tag_prefix=config.tag_prefix)
         except pygittools.PygittoolsError as e:
             raise exceptions.ReleaseMetadataError(f"Retrieving release tag error: {e}"
                                                   f'Repository must be tagged before regenerate.', _logger)
 
-    final_release_tag = _get_final_release_tag(release_tag, cwd, action)
-    _run_setup_cmd(['sdist', 'bdist_wheel'], release_tag=final_release_tag, cwd=cwd)
-    
-    package_path = utils.get_latest_tarball(Path(cwd) / settings.DirName.DISTRIBUTION)
+    final_release_tag = reltools.strip_tag_prefix(_get_final_release_tag(release_tag, cwd, action), config.tag_prefix)
+    package_path, wheel_path = _prepare_distributions(config, release_tag, final_release_tag, cwd)
     
     if final_release_tag and final_release_tag not in package_path.name:
         raise exceptions.RuntimeError('Source Distribution preparing error! '
                                       'Sdidt package name not valid. Please try again.', _logger) 
+    if final_release_tag and final_release_tag not in wheel_path.name:
+        raise exceptions.RuntimeError('Wheel preparing error! '
+                                      'Wheel package name not valid. Please try again.', _logger) 
     
     _logger.info(f'Source Distribution {utils.get_rel_path(package_path, cwd)} prepared properly.')
     
+    checksums_path = _write_checksums([package_path, wheel_path], release_tag=final_release_tag, 
+                                      with_metadata=config.artifacts_metadata, cwd=cwd)
+    _logger.info(f'Checksums written to {utils.get_rel_path(checksums_path, cwd)}.')
+    
     return package_path
 
 
-def _run_setup_cmd(cmd, release_tag=None, cwd='.'):
+def _prepare_distributions(config, release_tag, final_release_tag, cwd='.'):
+    cache_key = _get_build_cache_key(config, final_release_tag, cwd) if config.build_cache else None
+    cached_paths = _restore_from_build_cache(cache_key, cwd) if cache_key else None
+    if cached_paths:
+        package_path, wheel_path = cached_paths
+        _logger.info('Distributions restored from the build cache.')
+    else:
+        source_date_epoch = reltools.get_source_date_epoch(release_tag if final_release_tag else 'HEAD', cwd)
+        timeout = float(config.build_timeout) if config.build_timeout else None
+        package_path, wheel_path = _build_distributions(final_release_tag, reuse_backend=config.reuse_build_backend, 
+                                                        source_date_epoch=source_date_epoch, timeout=timeout, cwd=cwd)
+        if cache_key:
+            _store_in_build_cache(cache_key, [package_path, wheel_path])
+    _logger.info(f'Wheel {utils.get_rel_path(wheel_path, cwd)} prepared.')
+    
+    return package_path, wheel_path
+
+
+def _find_dist_wheel(config, final_release_tag, cwd='.'):
+    if not final_release_tag:
+        return None
+    try:
+        if pygittools.are_uncommited_changes(cwd):
+            return None
+    except pygittools.PygittoolsError:
+        return None
+    
+    dist_name = re.sub(r'[-_.]+', '_', config.project_name)
+    dist_path = Path(cwd).resolve() / settings.DirName.DISTRIBUTION
+    wheels_paths = sorted(dist_path.glob(f'{dist_name}-{final_release_tag}-*.whl'), 
+                          key=lambda path: path.stat().st_mtime)
+    
+    return wheels_paths[-1] if wheels_paths else None
+
+
+def _install_wheel(wheel_path, timeout=None, cancel_event=None, cwd='.'):
+    utils.execute_cmd_streaming([sys.executable, '-m', 'pip', 'install'] + settings.WHEEL_INSTALL_ARGS + 
+                                [str(wheel_path)], cwd, timeout=timeout, cancel_event=cancel_event)
+
+
+def _build_distributions(release_tag=None, reuse_backend=False, source_date_epoch=None, timeout=None, 
+                         cancel_event=None, cwd='.'):
     setup_path = Path(cwd).resolve() / settings.FileName.SETUP_PY
-    if not setup_path.exists():
+    if _get_build_backend(cwd)[0] == settings.DEFAULT_BUILD_BACKEND and not setup_path.exists():
         raise exceptions.FileNotFoundError(f'{utils.get_rel_path(setup_path, cwd)} '
                                            f'file not found that is necessary to the distribution process!', _logger)
-
+    
+    dist_path = Path(cwd).resolve() / settings.DirName.DISTRIBUTION
+    dist_path.mkdir(parents=True, exist_ok=True)
+    
     if release_tag:
-        os.environ['PBR_VERSION'] = release_tag
+        env = {'PBR_VERSION': release_tag}
     else:
+        env = {}
         _logger.info('Release tag will be set by pbr automatically.')
-    result = utils.execute_cmd([sys.executable, setup_path.__str__()] + cmd, cwd)
-    for line in result.splitlines():
-        _logger.info(line)
+    if source_date_epoch is not None:
+        env['SOURCE_DATE_EPOCH'] = str(source_date_epoch)
+    
+    build_path = Path(tempfile.mkdtemp(dir=dist_path))
+    tree_path = Path(tempfile.mkdtemp(prefix='.wheel-', dir=dist_path))
+    try:
+        wheel_cwd, wheel_env = _prepare_isolated_tree(tree_path, env, cwd)
+        builds = [
+            ('sdist', 'build_sdist', [str(build_path), {}], Path(cwd).resolve(), env),
+            ('wheel', 'build_wheel', [str(build_path), {}, None], wheel_cwd, wheel_env),
+        ]
+        interrupt_event = threading.Event()
+        with ThreadPoolExecutor(max_workers=len(builds)) as executor:
+            cancel_events = [cancel_event, interrupt_event]
+            futures = [executor.submit(_run_build_hook, *build, reuse_backend, timeout, cancel_events, cwd) 
+                       for build in builds]
+            try:
+                wait(futures)
+            except BaseException:
+                interrupt_event.set()
+                raise
+        
+        errors = [future.exception() for future in futures if future.exception()]
+        for (artifact, *_), future in zip(builds, futures):
+            if future.exception():
+                _logger.error(f'[{artifact}] Build failed: {future.exception()}')
+        if errors:
+            raise errors[0]
+        
+        sdist_name, wheel_name = [future.result() for future in futures]
+        reltools.normalize_tarball(build_path / sdist_name, source_date_epoch)
+        reltools.normalize_zip(build_path / wheel_name, source_date_epoch)
+        for name in [sdist_name, wheel_name]:
+            (build_path / name).replace(dist_path / name)
+    finally:
+        shutil.rmtree(build_path, ignore_errors=True)
+        shutil.rmtree(tree_path, ignore_errors=True)
+    
+    return dist_path / sdist_name, dist_path / wheel_name
+
+
+def _run_build_hook(artifact, hook, args, build_cwd, env, reuse_backend, timeout=None, cancel_events=None, cwd='.'):
+    hook_runner = _get_hook_runner(cwd, reuse_backend, slot=artifact)
+    try:
+        return _call_hook(hook_runner, hook, args, env, build_cwd, timeout=timeout, cancel_events=cancel_events)
+    finally:
+        if hook_runner not in _hook_runners.values():
+            _close_hook_runner(hook_runner)
+
+
+def _prepare_isolated_tree(tree_path, env, cwd='.'):
+    project_path = Path(cwd).resolve()
+    try:
+        repo_root = Path(pygittools.get_repo_root(cwd)).resolve()
+        work_tree_path = tree_path / repo_root.name
+        env = dict(env, GIT_DIR=str(pygittools.get_git_dir(cwd)), GIT_WORK_TREE=str(work_tree_path))
+    except pygittools.PygittoolsError:
+        repo_root = project_path
+        work_tree_path = tree_path / repo_root.name
+    
+    isolated_path = work_tree_path / project_path.relative_to(repo_root)
+    shutil.copytree(project_path, isolated_path, symlinks=True, 
+                    ignore=_get_isolated_tree_ignore(project_path), copy_function=_link_or_copy)
+    
+    return isolated_path, env
+
+
+def _get_isolated_tree_ignore(project_path):
+    def ignore(directory, names):
+        patterns = settings.BUILD_TREE_IGNORE + (settings.BUILD_TREE_ROOT_IGNORE 
+                                                 if Path(directory) == project_path else [])
+        return {name for name in names if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)}
+    
+    return ignore
+
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _get_build_cache_key(config, release_tag, cwd='.'):
+    try:
+        if pygittools.are_uncommited_changes(cwd):
+            return None
+        key_data = {
+            'tag': release_tag,
+            'tree': pygittools.get_tree_hash(cwd=cwd),
+            'commit': None if release_tag else pygittools.get_latest_commit_hash(cwd),
+        }
+    except pygittools.PygittoolsError:
+        return None
+    
+    backend, _ = _get_build_backend(cwd)
+    key_data['backend'] = backend
+    key_data['python'] = f'{platform.python_implementation()}{sys.version_info[0]}.{sys.version_info[1]}'
+    key_data['platform'] = sys.platform
+    for tool in [backend.split(':')[0].split('.')[0]] + settings.BUILD_CACHE_TOOLS:
+        try:
+            key_data[tool] = importlib_metadata.version(tool)
+        except importlib_metadata.PackageNotFoundError:
+            key_data[tool] = None
+    for field in settings.BUILD_CACHE_CONFIG_FIELDS:
+        key_data[field] = getattr(config, field)
+    
+    return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _restore_from_build_cache(cache_key, cwd='.'):
+    cache_path = utils.get_user_cache_dir() / settings.DirName.BUILD_CACHE
+    try:
+        with open(cache_path / cache_key / settings.FileName.BUILD_CACHE_MANIFEST, 'r') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    
+    dist_path = Path(cwd).resolve() / settings.DirName.DISTRIBUTION
+    dist_path.mkdir(parents=True, exist_ok=True)
+    artifacts_paths = []
+    for name, digest in manifest:
+        object_path = cache_path / settings.DirName.BUILD_CACHE_OBJECTS / digest
+        artifact_path = dist_path / name
+        try:
+            if artifact_path.exists():
+                artifact_path.unlink()
+            try:
+                os.link(object_path, artifact_path)
+            except OSError:
+                shutil.copy2(object_path, artifact_path)
+        except OSError as e:
+            _logger.warning(f'Build cache restoring error: {e}')
+            return None
+        artifacts_paths.append(artifact_path)
+    
+    return artifacts_paths
+
+
+def _store_in_build_cache(cache_key, artifacts_paths):
+    cache_path = utils.get_user_cache_dir() / settings.DirName.BUILD_CACHE
+    manifest = []
+    try:
+        (cache_path / settings.DirName.BUILD_CACHE_OBJECTS).mkdir(parents=True, exist_ok=True)
+        digests = _get_files_sha256(artifacts_paths)
+        for artifact_path in artifacts_paths:
+            digest = digests[artifact_path]
+            object_path = cache_path / settings.DirName.BUILD_CACHE_OBJECTS / digest
+            if not object_path.exists():
+                temp_path = object_path.with_suffix('.tmp')
+                shutil.copy2(artifact_path, temp_path)
+                temp_path.replace(object_path)
+            manifest.append([Path(artifact_path).name, digest])
         
+        (cache_path / cache_key).mkdir(exist_ok=True)
+        temp_path = cache_path / cache_key / f'{settings.FileName.BUILD_CACHE_MANIFEST}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(manifest, file)
+        temp_path.replace(cache_path / cache_key / settings.FileName.BUILD_CACHE_MANIFEST)
+    except OSError as e:
+        _logger.warning(f'Build cache storing error: {e}')
+
+
+def _write_checksums(artifacts_paths, release_tag=None, with_metadata=False, cwd='.'):
+    dist_path = Path(cwd).resolve() / settings.DirName.DISTRIBUTION
+    checksums_path = dist_path / settings.FileName.CHECKSUMS
+    checksums = {}
+    if checksums_path.exists():
+        for line in checksums_path.read_text(encoding='utf-8').splitlines():
+            digest, _, name = line.partition('  ')
+            if name and (dist_path / name).is_file():
+                checksums[name] = digest
+    digests = _get_files_sha256(artifacts_paths)
+    for artifact_path in artifacts_paths:
+        checksums[Path(artifact_path).name] = digests[artifact_path]
+    _write_text_atomic(checksums_path, ''.join(f'{checksums[name]}  {name}\n' for name in sorted(checksums)))
+    
+    if with_metadata:
+        metadata_path = dist_path / settings.FileName.ARTIFACTS_METADATA
+        try:
+            with open(metadata_path, 'r') as file:
+                metadata = {name: entry for name, entry in json.load(file).items() if name in checksums}
+        except (OSError, ValueError):
+            metadata = {}
+        try:
+            commit = pygittools.get_latest_commit_hash(cwd)
+        except pygittools.PygittoolsError:
+            commit = None
+        for artifact_path in artifacts_paths:
+            metadata[Path(artifact_path).name] = {
+                'sha256': digests[artifact_path],
+                'size': Path(artifact_path).stat().st_size,
+                'tag': release_tag,
+                'commit': commit,
+            }
+        _write_text_atomic(metadata_path, json.dumps(metadata, indent=4, sort_keys=True))
+    
+    return checksums_path
+
+
+def _write_text_atomic(path, content):
+    temp_path = Path(path).with_name(f'.{Path(path).name}.tmp')
+    temp_path.write_text(content, encoding='utf-8')
+    temp_path.replace(path)
+
+
+def _get_files_sha256(paths):
+    with ThreadPoolExecutor(max_workers=min(settings.HASH_MAX_WORKERS, len(paths)) or 1) as executor:
+        return dict(zip(paths, executor.map(_get_file_sha256, paths)))
+
+
+def _get_file_sha256(path):
+    path_stat = os.stat(path)
+    key = (str(Path(path).resolve()), path_stat.st_ino, path_stat.st_size, path_stat.st_mtime_ns)
+    if key in _files_sha256:
+        return _files_sha256[key]
+    
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as file:
+        if path_stat.st_size and path_stat.st_size >= settings.HASH_MMAP_MIN_SIZE:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                sha256.update(mapped)
+        else:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                sha256.update(chunk)
+    _files_sha256[key] = sha256.hexdigest()
+    
+    return _files_sha256[key]
+
+
+def _get_build_backend(cwd='.'):
+    pyproject_path = Path(cwd).resolve() / settings.FileName.PYPROJECT
+    build_system = {}
+    if pyproject_path.exists():
+        try:
+            try:
+                import tomllib
+            except ImportError:
+                import tomli as tomllib
+        except ImportError:
+            _logger.warning(f'{settings.FileName.PYPROJECT} cannot be read without tomli package installed! '
+                            f'Default build backend {settings.DEFAULT_BUILD_BACKEND} used.')
+        else:
+            with open(pyproject_path, 'rb') as file:
+                build_system = tomllib.load(file).get('build-system', {})
+    
+    backend_paths = [str(Path(cwd).resolve() / path) for path in build_system.get('backend-path', [])]
+    return build_system.get('build-backend', settings.DEFAULT_BUILD_BACKEND), backend_paths
+
+
+def _get_hook_runner(cwd='.', reuse=False, slot=None):
+    reuse = reuse and hasattr(os, 'fork')
+    backend, backend_paths = _get_build_backend(cwd)
+    key = (str(Path(cwd).resolve()), backend, slot)
+    hook_runner = _hook_runners.get(key) if reuse else None
+    if hook_runner and hook_runner.poll() is None:
+        return hook_runner
+    
+    hook_runner = subprocess.Popen([sys.executable, '-c', _HOOK_RUNNER, backend, json.dumps(backend_paths)],
+                                   cwd=str(Path(cwd).resolve()),
+                                   stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE,
+                                   encoding='utf-8',
+                                   errors='replace',
+                                   start_new_session=os.name != 'nt')
+    hook_runner.output_tail = collections.deque(maxlen=settings.CMD_OUTPUT_TAIL_LINES)
+    threading.Thread(target=_log_hook_runner_output, args=(hook_runner, slot), daemon=True).start()
+    if reuse:
+        _hook_runners[key] = hook_runner
     
+    return hook_runner
+
+
+def _call_hook(hook_runner, hook, args, env, cwd='.', timeout=None, cancel_events=None):
+    hook_runner.output_tail.clear()
+    finished = threading.Event()
+    interruption = []
+    watchdog = threading.Thread(target=_watch_hook_runner, 
+                                args=(hook_runner, finished, interruption, timeout, cancel_events), daemon=True)
+    watchdog.start()
+    try:
+        hook_runner.stdin.write(json.dumps({'hook': hook, 'args': args, 'env': env, 
+                                            'cwd': str(Path(cwd).resolve())}) + '\n')
+        hook_runner.stdin.flush()
+        response = hook_runner.stdout.readline()
+    except OSError as e:
+        response = None
+        if not interruption:
+            raise exceptions.RuntimeError(_format_hook_error(hook_runner, f'Build backend {hook} hook error: {e}'), 
+                                          _logger)
+    except BaseException:
+        _kill_hook_runner(hook_runner)
+        raise
+    finally:
+        finished.set()
+        watchdog.join()
+    
+    if interruption == ['timeout']:
+        raise exceptions.ExecuteCmdTimeoutError(hook_runner.returncode, _format_hook_error(
+            hook_runner, f'Build backend {hook} hook timed out after {timeout}s.'), _logger)
+    if interruption == ['cancel']:
+        raise exceptions.ExecuteCmdCancelledError(hook_runner.returncode, _format_hook_error(
+            hook_runner, f'Build backend {hook} hook cancelled.'), _logger)
+    if not response:
+        raise exceptions.RuntimeError(_format_hook_error(hook_runner, f'Build backend exited unexpectedly with code '
+                                                                      f'{hook_runner.wait()} during {hook} hook.'), 
+                                      _logger)
+    response = json.loads(response)
+    if 'error' in response:
+        raise exceptions.RuntimeError(_format_hook_error(hook_runner, f'Build backend {hook} hook error: '
+                                                                      f'{response["error"]}'), _logger)
+    
+    return response['result']
+
+
+def _watch_hook_runner(hook_runner, finished, interruption, timeout=None, cancel_events=None):
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while not finished.wait(settings.CMD_POLL_INTERVAL):
+        if any(event is not None and event.is_set() for event in cancel_events or []):
+            interruption.append('cancel')
+        elif deadline is not None and time.monotonic() > deadline:
+            interruption.append('timeout')
+        else:
+            continue
+        _kill_hook_runner(hook_runner)
+        return
+
+
+def _kill_hook_runner(hook_runner):
+    if hook_runner.poll() is not None:
+        return
+    try:
+        if os.name != 'nt':
+            os.killpg(hook_runner.pid, signal.SIGKILL)
+        else:
+            hook_runner.kill()
+    except OSError:
+        pass
+    hook_runner.wait()
+
+
+def _format_hook_error(hook_runner, msg):
+    tail = list(hook_runner.output_tail)
+    return '\n'.join([msg] + (['Build backend output:'] + tail if tail else []))
+
+
+def _log_hook_runner_output(hook_runner, label=None):
+    for line in hook_runner.stderr:
+        line = line.rstrip()
+        hook_runner.output_tail.append(line)
+        _logger.info(f'[{label}] {line}' if label else line)
+
+
+def _close_hook_runner(hook_runner):
+    if hook_runner.poll() is None:
+        hook_runner.stdin.close()
+        hook_runner.wait()
+    hook_runner.stdout.close()
+
+
+@atexit.register
+def _close_hook_runners():
+    for hook_runner in _hook_runners.values():
+        _close_hook_runner(hook_runner)
+    _hook_runners.clear()
+
+
 def _get_final_release_tag(release_tag, cwd, action=None):
     if not action or (action == ReleaseAction.REGENERATE):
         try:
@@ -158,6 +645,18 @@ def _get_final_release_tag(release_tag, cwd, action=None):
         return release_tag
         
 
+def _get_history_scope(config, cwd='.'):
+    if config.history_scope:
+        return [config.history_scope] if isinstance(config.history_scope, str) else config.history_scope
+    
+    try:
+        repo_root = pygittools.get_repo_root(cwd)
+    except pygittools.PygittoolsError as e:
+        raise exceptions.ReleaseMetadataError(f'Retrieving repository root error: {e}', _logger)
+    
+    return None if repo_root == Path(cwd).resolve() else ['.']
+        
+
 def _release_checkout(config):
     action = wizard.choose_one(__name__, 
                                'Make Release or Regenerate a release package using the actual release metadata',
@@ -2,16 +2,29 @@
 # -*- coding: utf-8 -*-
 
 
+import io
+import os
 import re
+import gzip
+import lzma
+import stat
+import time
+import tarfile
+import functools
+import contextlib
+import collections
+import zipfile
 import semver
 import jinja2
 import shutil
+import logging
 import datetime
 import platform
 import tempfile
 import subprocess
 from enum import Enum
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
 from packaging import version as pkg_version
 
 try:
@@ -43,6 +56,9 @@ _EXAMPLE_RELEASE_TAG_C = '1.17.3-alpha.2'
 _SUGGESTED_INITIAL_RELEASE_TAG_HW = '0.1'
 _EXAMPLE_RELEASE_TAG_HW = '<Major Version>.<Minor Version> e.g. 1.17-alpha.2'
 _AUTOMATIC_RELEASE_COMMIT_MSG = 'Automatic update of release data files.'
+_ZIP_MIN_TIMESTAMP = 315532800
+_ARCHIVE_CHUNK_SIZE = 1024 * 1024
+_COMPRESSION_BLOCK_SIZE = 4 * 1024 * 1024
 
 
 class RelToolsError(Exception):
@@ -137,7 +153,7 @@ def check_if_changes_to_commit(cwd):
         raise UncommitedChangesError("Error occured when checking if there are any changes to commit!", _logger)
 
 
-def prompt_release_tag(tag_type, cwd='.'):
+def prompt_release_tag(tag_type, cwd='.', tag_prefix=None):
     if tag_type == TagType.PYTHON:
         suggested_initial_release_tag = _SUGGESTED_INITIAL_RELEASE_TAG_PYTHON
         example_release_tag = _EXAMPLE_RELEASE_TAG_PYTHON
@@ -156,7 +172,7 @@ def prompt_release_tag(tag_type, cwd='.'):
     else:
         raise ValueError('Invalid tag_type', _logger)
     
-    latest_release_tag = _get_latest_tag(suggested_initial_release_tag, cwd)
+    latest_release_tag = _get_latest_tag(suggested_initial_release_tag, cwd, tag_prefix)
 
     is_tag_valid = False
     comparing_release_tags = True
@@ -190,7 +206,7 @@ def prompt_release_tag(tag_type, cwd='.'):
     return new_release_tag
 
 
-def prompt_release_msg(cwd='.'):
+def prompt_release_msg(cwd='.', paths=None, tag_prefix=None):
     tip_msg = f"""{_TIP_MSG_MARK}Below are commit messages generated from the last tag.
 {_TIP_MSG_MARK}If the last tag not exists, messages are from the first commit.
 {_TIP_MSG_MARK}Use these messages to prepare a relevant release message.
@@ -200,7 +216,7 @@ def prompt_release_msg(cwd='.'):
 """
 
     try:
-        current_log = pygittools.get_commit_msgs_from_last_tag(cwd)
+        current_log = pygittools.get_commit_msgs_from_last_tag(cwd, paths=paths, tag_prefix=tag_prefix)
     except pygittools.PygittoolsError:
         info_msg = tip_msg
     else:
@@ -341,21 +357,29 @@ def _convert_tag_to_semantic_tag(tag):
             raise ReleaseTagError("Release tag is not valid", _logger)
 
 
-def _get_latest_tag(suggested_initial_release_tag, cwd):
+def _get_latest_tag(suggested_initial_release_tag, cwd, tag_prefix=None):
     try:
-        latest_release_tag = pygittools.get_latest_tag(cwd)
+        latest_release_tag = pygittools.get_latest_tag(cwd, tag_prefix=tag_prefix)
     except pygittools.PygittoolsError:
         _logger.tip(f'Repo has not been tagged yet. '
                     f'Proposed initial release tag: {suggested_initial_release_tag}')
         latest_release_tag = None
     else:
         _logger.info(f'Last release tag: {latest_release_tag}')
+        latest_release_tag = strip_tag_prefix(latest_release_tag, tag_prefix)
 
     return latest_release_tag
 
 
+def strip_tag_prefix(tag, tag_prefix=None):
+    if tag and tag_prefix and tag.startswith(tag_prefix):
+        return tag[len(tag_prefix):]
+
+    return tag
+
+
 def commit_and_push_release_update(new_release_tag, new_release_msg, ssh_key=None, 
-                                   files_to_add=None, push=True, cwd='.', prompt=True, debug=None):
+                                   files_to_add=None, push=True, cwd='.', prompt=True, tag_prefix=None, debug=None):
     if push:
         _logger.info('Commit updated release files, set tag and push...')
     else:
@@ -384,7 +408,7 @@ def commit_and_push_release_update(new_release_tag, new_release_msg, ssh_key=Non
         raise ReleaseTagSetError(f"Error while setting release tag: {e}", _logger)
     
     try:
-        new_latest_tag = pygittools.get_latest_tag(cwd)
+        new_latest_tag = pygittools.get_latest_tag(cwd, tag_prefix=tag_prefix)
     except pygittools.PygittoolsError as e:
         _clean_failed_release(new_release_tag, cwd)
         raise ReleaseTagSetError(f"Error while check if the new release tag was set properly: {e}", _logger)
@@ -461,9 +485,70 @@ def _clean_failed_release(new_release_tag, cwd):
                             'Please check git log, repo tree and cleanup the mess.', _logger)
 
 
-def get_latest_tag_on_regenerate(cwd):
+def complete_shallow_history(cwd='.'):
+    try:
+        if not pygittools.is_shallow_repo(cwd):
+            return False
+    except pygittools.PygittoolsError as e:
+        _logger.warning(f'Checking if repository is shallow error: {e}')
+        return False
+    
+    _logger.info('Shallow repository detected. Fetching the missing history and tags...')
     try:
-        return pygittools.get_latest_tag(cwd)
+        pygittools.fetch_unshallow(cwd=cwd)
+    except pygittools.PygittoolsError as e:
+        _logger.warning(f'Fetching the missing history error: {e}. '
+                        f'Release tag, changelog and authors may be incomplete.')
+        return False
+    
+    return True
+
+
+def refresh_history_indexes(cwd='.'):
+    try:
+        is_commit_graph_stale = pygittools.is_commit_graph_stale(cwd)
+        is_multi_pack_index_stale = pygittools.is_multi_pack_index_stale(cwd)
+    except pygittools.PygittoolsError as e:
+        _logger.warning(f'Checking commit-graph and multi-pack-index error: {e}')
+        return False
+
+    if not is_commit_graph_stale and not is_multi_pack_index_stale:
+        _logger.debug('Commit-graph and multi-pack-index are up to date.')
+        return False
+
+    _logger.info('Refreshing commit-graph and multi-pack-index...')
+    is_measured = _logger.isEnabledFor(logging.DEBUG)
+    time_before = _measure_history_walk(cwd) if is_measured else None
+    try:
+        if is_commit_graph_stale:
+            pygittools.write_commit_graph(cwd)
+        if is_multi_pack_index_stale:
+            pygittools.write_multi_pack_index(cwd)
+    except pygittools.PygittoolsError as e:
+        _logger.warning(f'Writing commit-graph or multi-pack-index error: {e}')
+        return False
+    time_after = _measure_history_walk(cwd) if is_measured else None
+
+    if time_before is not None and time_after:
+        _logger.debug(f'History walk time: {time_before * 1000:.1f} ms -> {time_after * 1000:.1f} ms, '
+                      f'speedup: x{time_before / time_after:.2f}')
+
+    return True
+
+
+def _measure_history_walk(cwd='.'):
+    start = time.perf_counter()
+    try:
+        pygittools.get_commits_count(cwd)
+    except pygittools.PygittoolsError:
+        return None
+
+    return time.perf_counter() - start
+
+
+def get_latest_tag_on_regenerate(cwd, tag_prefix=None):
+    try:
+        return pygittools.get_latest_tag(cwd, tag_prefix=tag_prefix)
     except pygittools.PygittoolsError as e:
         raise ReleaseTagGetError(f'Retrieving release tag error: {e}'
                                  f'Repository must be tagged before regenerate.', _logger)
@@ -473,7 +558,7 @@ def update_changelog(changelog_type, changelog_filename,
                      keywords, new_release_tag, new_release_msg, 
                      changelog_generated_template_path=None, 
                      changelog_prepared_template_path=None, 
-                     cwd='.'):
+                     cwd='.', tag_prefix=None):
     if changelog_type == ChangelogType.PREPARED:
         if changelog_prepared_template_path is None:
             raise ValueError('changelog_prepared_template_path cannot be None', _logger);
@@ -482,19 +567,21 @@ def update_changelog(changelog_type, changelog_filename,
         if changelog_generated_template_path is None:
             raise ValueError('changelog_generated_template_path cannot be None', _logger);
         path = _update_generated_changelog(changelog_filename, changelog_generated_template_path, 
-                                           keywords, new_release_tag, new_release_msg, cwd=cwd)
+                                           keywords, new_release_tag, new_release_msg, cwd=cwd, 
+                                           tag_prefix=tag_prefix)
 
     return path
 
 
 def _update_generated_changelog(changelog_filename, changelog_generated_template_path, 
-                                keywords, new_release_tag, new_release_msg, cwd='.'):
+                                keywords, new_release_tag, new_release_msg, cwd='.', tag_prefix=None):
     _logger.info(f'Updating {changelog_filename} file...')
     
     changelog_path = Path(cwd).resolve() / changelog_filename
     try:
         changelog_content = pygittools.get_changelog(
-            report_format='### Version: %(tag) | Released: %(taggerdate:short) \r\n%(contents)', cwd=cwd)
+            report_format='### Version: %(tag) | Released: %(taggerdate:short) \r\n%(contents)', cwd=cwd, 
+            tag_prefix=tag_prefix)
     except pygittools.PygittoolsError as e:
         raise ChangelogGenerationError(f'{changelog_filename} generation error: {e}', _logger)
     
@@ -545,7 +632,7 @@ def _generate_prepared_file(filename, template_path, keywords, cwd='.'):
 def update_authors(authors_type, authors_filename, keywords, 
                    authors_generated_template_path=None,
                    authors_prepared_template_path=None, 
-                   cwd='.'):
+                   cwd='.', paths=None):
     if authors_type == AuthorsType.PREPARED:
         if authors_prepared_template_path is None:
             raise ValueError('authors_prepared_template_path cannot be None', _logger);
@@ -553,17 +640,18 @@ def update_authors(authors_type, authors_filename, keywords,
     elif authors_type == AuthorsType.GENERATED:
         if authors_generated_template_path is None:
             raise ValueError('authors_generated_template_path cannot be None', _logger);
-        path = _update_generated_authors(authors_filename, authors_generated_template_path, keywords, cwd=cwd)
+        path = _update_generated_authors(authors_filename, authors_generated_template_path, keywords, cwd=cwd, 
+                                         paths=paths)
 
     return path
 
 
-def _update_generated_authors(authors_filename, authors_generated_template_path, keywords, cwd='.'):
+def _update_generated_authors(authors_filename, authors_generated_template_path, keywords, cwd='.', paths=None):
     _logger.info(f'Updating {authors_filename} file...')
     
     authors_path = Path(cwd).resolve() / authors_filename
     try:
-        authors_content = '\n'.join(pygittools.get_authors(cwd=cwd))
+        authors_content = '\n'.join(pygittools.get_authors(cwd=cwd, paths=paths))
     except pygittools.NoAuthorsError:
         authors_content = ''
     except pygittools.PygittoolsError as e:
@@ -584,37 +672,264 @@ def _update_generated_authors(authors_filename, authors_generated_template_path,
     return authors_path
 
 
-def prepare_archive(archive_name, dst_dir, files, files_root='.', add_extra_files=None, extension='zip', cwd='.'):
-    archive_path = Path(cwd).resolve() / dst_dir / (archive_name + f'.{extension}')
-    temp_dir = archive_path.parent / archive_name
+def prepare_archive(archive_name, dst_dir, files, files_root='.', add_extra_files=None, extension='zip', 
+                    source_date_epoch=None, compression_level=None, extra_entries=None, cwd='.'):
+    if extension not in _ARCHIVE_FORMATS:
+        raise ValueError(f'Archive format {extension} not supported!', _logger)
     
-    if temp_dir.exists():
-        shutil.rmtree(temp_dir)
+    suffix, write_archive = _ARCHIVE_FORMATS[extension]
+    archive_path = Path(cwd).resolve() / dst_dir / (archive_name + suffix)
+    files_root = Path(files_root).resolve()
     if archive_path.exists():
         archive_path.unlink()
     
-    Path(dst_dir).mkdir(parents=True, exist_ok=True)
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    entries = {}
+    def add_entry(arcname, content=None, mode=None):
+        arcname = PurePosixPath(arcname)
+        for parent in list(arcname.parents)[:-1]:
+            entries.setdefault(parent.as_posix(), (None, None))
+        if arcname.as_posix() != '.':
+            entries[arcname.as_posix()] = (content, mode)
     
-    copy_list = _prepare_copy_list(files)
-    for path in copy_list:
-        dst = temp_dir / path.resolve().relative_to(Path(files_root).resolve())
+    for path in _prepare_copy_list(files):
+        arcname = PurePosixPath(path.resolve().relative_to(files_root).as_posix())
+        add_entry(arcname, path)
         if path.is_dir():
-            if not dst.exists():
-                shutil.copytree(path, dst)
+            for subpath in path.rglob('*'):
+                add_entry(arcname / subpath.relative_to(path).as_posix(), subpath)
+    
+    staging_dir = None
+    temp_path = archive_path.with_name(f'.{archive_path.name}.tmp')
+    try:
+        if add_extra_files:
+            staging_dir = Path(tempfile.mkdtemp(prefix=f'.{archive_name}.', dir=archive_path.parent))
+            add_extra_files(staging_dir)
+            for path in sorted(staging_dir.rglob('*')):
+                add_entry(path.relative_to(staging_dir).as_posix(), path)
+        if callable(extra_entries):
+            extra_entries(add_entry)
+        elif extra_entries:
+            for arcname, content in extra_entries.items():
+                add_entry(arcname, content)
+        
+        if source_date_epoch is None:
+            source_date_epoch = get_source_date_epoch(cwd=cwd)
+        write_archive(temp_path, entries, source_date_epoch, compression_level)
+        temp_path.replace(archive_path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+        if staging_dir:
+            shutil.rmtree(staging_dir)
+            
+    return archive_path
+
+
+def get_source_date_epoch(rev='HEAD', cwd='.'):
+    if os.environ.get('SOURCE_DATE_EPOCH'):
+        return int(os.environ['SOURCE_DATE_EPOCH'])
+    try:
+        return pygittools.get_commit_timestamp(rev, cwd)
+    except pygittools.PygittoolsError:
+        return None
+
+
+def normalize_zip(path, mtime=None):
+    temp_path = Path(path).with_name(f'.{Path(path).name}.tmp')
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            is_dir = info.is_dir()
+            mode = _normalize_mode((info.external_attr >> 16) & 0o777, is_dir)
+            dst.writestr(_get_zip_info(info.filename, is_dir, mode, mtime or info.date_time), 
+                         b'' if is_dir else src.read(info))
+    temp_path.replace(path)
+
+
+def normalize_tarball(path, mtime=None):
+    temp_path = Path(path).with_name(f'.{Path(path).name}.tmp')
+    with tarfile.open(path, 'r:*') as src, \
+            _open_tarball(temp_path, mtime, codec=_get_tarball_codec(path), parallel=False) as dst:
+        for member in sorted(src.getmembers(), key=lambda member: member.name):
+            fileobj = src.extractfile(member) if member.isfile() else None
+            _normalize_tarinfo(member, mtime or member.mtime)
+            dst.addfile(member, fileobj)
+    temp_path.replace(path)
+
+
+def _write_zip_archive(archive_path, entries, mtime=None, compression_level=None, compression=zipfile.ZIP_DEFLATED):
+    with zipfile.ZipFile(archive_path, 'w', compression, compresslevel=compression_level) as archive:
+        for arcname in sorted(entries):
+            content, is_dir, mode, size, entry_mtime = _get_entry_attributes(*entries[arcname])
+            info = _get_zip_info(arcname, is_dir, mode, mtime or entry_mtime, compression_level, compression)
+            if isinstance(content, Path) and not is_dir:
+                force_zip64 = size >= zipfile.ZIP64_LIMIT
+                with open(content, 'rb') as src, archive.open(info, 'w', force_zip64=force_zip64) as dst:
+                    shutil.copyfileobj(src, dst, _ARCHIVE_CHUNK_SIZE)
+            else:
+                archive.writestr(info, b'' if is_dir else content)
+
+
+def _write_tar_archive(archive_path, entries, mtime=None, compression_level=None, codec=None):
+    with _open_tarball(archive_path, mtime, codec, compression_level) as archive:
+        for arcname in sorted(entries):
+            content, is_dir, mode, size, entry_mtime = _get_entry_attributes(*entries[arcname])
+            tarinfo = tarfile.TarInfo(arcname)
+            tarinfo.type = tarfile.DIRTYPE if is_dir else tarfile.REGTYPE
+            tarinfo.size = size
+            tarinfo.mode = mode
+            _normalize_tarinfo(tarinfo, mtime or entry_mtime)
+            if is_dir:
+                archive.addfile(tarinfo)
+            elif isinstance(content, Path):
+                with open(content, 'rb') as src:
+                    archive.addfile(tarinfo, src)
+            else:
+                archive.addfile(tarinfo, io.BytesIO(content))
+
+
+_ARCHIVE_FORMATS = {
+    'zip': ('.zip', _write_zip_archive),
+    'store': ('.zip', functools.partial(_write_zip_archive, compression=zipfile.ZIP_STORED)),
+    'tar': ('.tar', _write_tar_archive),
+    'tar.gz': ('.tar.gz', functools.partial(_write_tar_archive, codec='gz')),
+    'tar.xz': ('.tar.xz', functools.partial(_write_tar_archive, codec='xz')),
+}
+
+
+def _get_entry_attributes(content, mode=None):
+    if isinstance(content, Path):
+        path_stat = content.stat()
+        is_dir = stat.S_ISDIR(path_stat.st_mode)
+        return (content, is_dir, _normalize_mode(mode or path_stat.st_mode, is_dir), 
+                0 if is_dir else path_stat.st_size, path_stat.st_mtime)
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    is_dir = content is None
+    
+    return content, is_dir, _normalize_mode(mode or 0, is_dir), 0 if is_dir else len(content), time.time()
+
+
+@contextlib.contextmanager
+def _open_tarball(path, mtime=None, codec=None, compression_level=None, parallel=True):
+    with open(path, 'wb') as file:
+        if codec:
+            compressor = _BlockCompressor if parallel else _STREAM_COMPRESSORS[codec]
+            with compressor(file, codec, mtime, compression_level) as fileobj:
+                with tarfile.open(mode='w', fileobj=fileobj, format=tarfile.PAX_FORMAT) as archive:
+                    yield archive
+        else:
+            with tarfile.open(mode='w', fileobj=file, format=tarfile.PAX_FORMAT) as archive:
+                yield archive
+
+
+def _get_tarball_codec(path):
+    for suffixes, codec in [(('.gz', '.tgz'), 'gz'), (('.xz', '.txz'), 'xz')]:
+        if Path(path).name.endswith(suffixes):
+            return codec
+    return None
+
+
+class _BlockCompressor():
+    def __init__(self, file, codec, mtime=None, compression_level=None):
+        self._file = file
+        self._compress = functools.partial(_BLOCK_COMPRESSORS[codec], mtime=mtime, compression_level=compression_level)
+        self._buffer = bytearray()
+        self._max_workers = os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+        self._pending = collections.deque()
+        self._position = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
         else:
-            if not dst.exists():
-                dst.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy(path, dst)
+            for future in self._pending:
+                future.cancel()
+            self._executor.shutdown()
     
-    if add_extra_files:
-        add_extra_files(temp_dir)
+    def tell(self):
+        return self._position
     
-    zip_archive_name = shutil.make_archive(temp_dir, extension, temp_dir)
-    shutil.rmtree(temp_dir)
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        while len(self._buffer) >= _COMPRESSION_BLOCK_SIZE:
+            self._submit(bytes(self._buffer[:_COMPRESSION_BLOCK_SIZE]))
+            del self._buffer[:_COMPRESSION_BLOCK_SIZE]
+        return len(data)
     
-    assert archive_path.name == Path(zip_archive_name).name
-            
-    return archive_path
+    def close(self):
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        while self._pending:
+            self._file.write(self._pending.popleft().result())
+        self._executor.shutdown()
+    
+    def _submit(self, block):
+        self._pending.append(self._executor.submit(self._compress, block))
+        while len(self._pending) > 2 * self._max_workers:
+            self._file.write(self._pending.popleft().result())
+
+
+def _compress_gzip_block(data, mtime=None, compression_level=None):
+    buffer = io.BytesIO()
+    with _open_gzip_stream(buffer, 'gz', mtime, compression_level) as file:
+        file.write(data)
+    return buffer.getvalue()
+
+
+def _compress_xz_block(data, mtime=None, compression_level=None):
+    return lzma.compress(data, preset=compression_level)
+
+
+_BLOCK_COMPRESSORS = {
+    'gz': _compress_gzip_block,
+    'xz': _compress_xz_block,
+}
+
+
+def _open_gzip_stream(file, codec, mtime=None, compression_level=None):
+    return gzip.GzipFile(filename='', mode='wb', fileobj=file, mtime=mtime or 0, 
+                         compresslevel=9 if compression_level is None else compression_level)
+
+
+def _open_xz_stream(file, codec, mtime=None, compression_level=None):
+    return lzma.LZMAFile(file, 'wb', preset=compression_level)
+
+
+_STREAM_COMPRESSORS = {
+    'gz': _open_gzip_stream,
+    'xz': _open_xz_stream,
+}
+
+
+def _get_zip_info(arcname, is_dir, mode, mtime, compression_level=None, compression=zipfile.ZIP_DEFLATED):
+    date_time = mtime if isinstance(mtime, tuple) else time.gmtime(max(mtime, _ZIP_MIN_TIMESTAMP))[:6]
+    info = zipfile.ZipInfo(arcname + '/' if is_dir and not arcname.endswith('/') else arcname, date_time)
+    info.compress_type = zipfile.ZIP_STORED if is_dir else compression
+    info._compresslevel = compression_level
+    info.external_attr = ((stat.S_IFDIR if is_dir else stat.S_IFREG) | mode) << 16
+    if is_dir:
+        info.external_attr |= 0x10
+    return info
+
+
+def _normalize_tarinfo(tarinfo, mtime):
+    tarinfo.mtime = int(mtime)
+    tarinfo.uid = tarinfo.gid = 0
+    tarinfo.uname = tarinfo.gname = ''
+    tarinfo.mode = _normalize_mode(tarinfo.mode, tarinfo.isdir())
+    tarinfo.pax_headers = {}
+
+
+def _normalize_mode(mode, is_dir):
+    return 0o755 if is_dir or mode & 0o111 else 0o644
 
 
 def _prepare_copy_list(paths):
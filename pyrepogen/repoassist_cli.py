@@ -26,8 +26,12 @@ def main():
     subparsers = parser.add_subparsers(help='Available commands are:', dest='command', required=True)
     parser.add_argument('-q', '--quiet', dest='quiet', action='store_true', default=False, help='Disable output')
     parser.add_argument('-d', '--debug', dest='debug', action='store_true', default=False, help='Enable debug output')
-    subparsers.add_parser('update_reqs', 
-                          help='Prepare requirements.txt and requirements-dev.txt files. If file exists, updates it.')
+    update_reqs_parser = subparsers.add_parser('update_reqs', help='Prepare requirements.txt and requirements-dev.txt '
+                                               'files. If file exists, updates it.')
+    update_reqs_parser.add_argument('--offline', dest='offline', action='store_true', default=False, 
+                                    help='Do not access the package index, use only the local packages and cache.')
+    update_reqs_parser.add_argument('--lock', dest='lock', action='store_true', default=False, 
+                                    help='Also prepare requirements.lock file with all installed dependencies pinned.')
     release_parser = subparsers.add_parser('release', help='Prepare a source distribution package.')
     release_parser.add_argument('force', nargs='?', action='store', default=False, 
                                 help='Force action, no repository check, no git check.')
@@ -37,7 +41,16 @@ def main():
     subparsers.add_parser('upload', help='Upload a source distribution package to the cloud.')
     subparsers.add_parser('list_cloud', help='List buckets on the cloud server.')
     subparsers.add_parser('download_package', help='Download package from the cloud server.')
-    subparsers.add_parser('clean', help='Clean repository from dummy files.')
+    clean_parser = subparsers.add_parser('clean', help='Clean repository from dummy files.')
+    clean_parser.add_argument('--wait', dest='wait', action='store_true', default=False, 
+                              help='Wait until removed directories are deleted instead of deleting them '
+                                   'in the background.')
+    clean_parser.add_argument('--dry-run', dest='dry_run', action='store_true', default=False, 
+                              help='Only list files and directories to remove with the space to reclaim.')
+    clean_parser.add_argument('--git', dest='git_ignored', action='store_true', default=False, 
+                              help='Remove all files and directories ignored by git instead of the predefined ones.')
+    clean_parser.add_argument('--keep', dest='keep', action='append', default=[], 
+                              help='Path or pattern kept by the --git mode. Can be used multiple times.')
     subparsers.add_parser('coverage_report', help='Show the html coverage report in the default system browser.')
     subparsers.add_parser('update', help='Update Repoassist to version from installed Pyrepogen.')
     format_parser = subparsers.add_parser('format', help='Format a python source file using autopep8.')
@@ -61,12 +74,18 @@ def main():
         try:
             if command == 'update_reqs':
                 config = utils.get_repo_config_from_setup_cfg(Path(cwd) / settings.FileName.SETUP_CFG)
+                if args.offline:
+                    config.pypi_offline = True
                 if config.project_type == settings.ProjectType.PACKAGE.value:
                     reqs_cwd = cwd / config.project_name
                 else:
                     reqs_cwd = cwd
-                reqs = colreqs.collect_reqs_min(config, prompt=True, cwd=reqs_cwd)
+                reqs = colreqs.collect_reqs_min(config, prompt=True, cwd=reqs_cwd, 
+                                                cache_dir=cwd / settings.DirName.REPOASSIST_CACHE, root_dir=cwd)
                 colreqs.write_requirements(reqs, cwd)
+                if args.lock:
+                    reqs_lock = colreqs.collect_reqs_lock(reqs + settings.DEFAULT_REQUIREMENTS)
+                    colreqs.write_requirements_lock(reqs_lock, cwd)
                 colreqs.write_requirements_dev(cwd)
             elif command == 'release':
                 release.make_release(options=args, cwd=cwd)
@@ -90,7 +109,12 @@ def main():
                                                   'Please check if it is installed properly', _logger)
                 print(utils.execute_cmd(('pyrepogen', '-u', '.'), cwd).strip())
             elif command == 'clean':
-                clean.clean(cwd)
+                keep = list(args.keep)
+                if args.git_ignored and (Path(cwd) / settings.FileName.SETUP_CFG).exists():
+                    config = utils.get_repo_config_from_setup_cfg(Path(cwd) / settings.FileName.SETUP_CFG)
+                    if config.clean_keep:
+                        keep += [config.clean_keep] if isinstance(config.clean_keep, str) else config.clean_keep
+                clean.clean(cwd, wait=args.wait, dry_run=args.dry_run, git_ignored=args.git_ignored, keep=keep)
             else:
                 _logger.error('Invalid command.')
         except (exceptions.PyRepoGenError, sicloudman.SiCloudManError, meldformat.MeldFormatError, reltools.RelToolsError) as e:
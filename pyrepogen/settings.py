@@ -28,6 +28,12 @@ class ProjectType(Enum):
     MODULE = 'module'
     
 
+class CloneStrategy(Enum):
+    FULL = 'full'
+    PARTIAL = 'partial'
+    SHALLOW = 'shallow'
+
+
 class ChangelogType(Enum):
     GENERATED = 'generated'
     PREPARED = 'prepared'
@@ -47,6 +53,11 @@ class DirName():
     GIT = '.git'
     RELEASE = 'release'
     HTMLCOV = 'htmlcov'
+    USER_CACHE = 'pyrepogen'
+    REPOASSIST_CACHE = '.repoassist_cache'
+    CLEAN_TRASH = '.repoassist_trash'
+    BUILD_CACHE = 'builds'
+    BUILD_CACHE_OBJECTS = 'objects'
 
 
 REPO_CONFIG_SECTION_NAME = 'repoconfig'
@@ -61,10 +72,23 @@ TEMPLATES_MODULE_PATH = 'templates/module'
 
 REPOASSIST_VERSION = f'{DirName.REPOASSIST}_version'
 AUTOMATIC_RELEASE_COMMIT_MSG = 'Automatic update of release data files.'
+INITIAL_COMMIT_MSG = 'Initial commit of generated repository files.'
 LICENSE = 'MIT'
 RELEASE_PACKAGE_SUFFIX = '_release'
 JINJA2_TEMPLATE_EXT = '.j2'
 TARBALL_SUFFIX = '.tar'
+DEFAULT_BUILD_BACKEND = 'setuptools.build_meta:__legacy__'
+WHEEL_INSTALL_ARGS = ['--no-index', '--no-deps', '--no-build-isolation', '--force-reinstall']
+HASH_MAX_WORKERS = 4
+HASH_MMAP_MIN_SIZE = 4 * 1024 * 1024
+BUILD_CACHE_TOOLS = ['pbr', 'wheel']
+BUILD_TREE_IGNORE = [DirName.GIT, '__pycache__']
+BUILD_TREE_ROOT_IGNORE = [DirName.DISTRIBUTION, 'build', '*.egg-info', '.eggs', '.tox', 'venv*', '.venv', 
+                          DirName.REPOASSIST_CACHE, DirName.CLEAN_TRASH]
+BUILD_CACHE_CONFIG_FIELDS = ['project_name', 'project_type', 'tag_prefix']
+PARTIAL_CLONE_FILTER = 'blob:none'
+CMD_OUTPUT_TAIL_LINES = 200
+CMD_POLL_INTERVAL = 0.1
 
 ENTRY_POINT_PLACEHOLDER = '<project_name>'
 MODULE_ENTRY_POINT = f'{ENTRY_POINT_PLACEHOLDER} = {ENTRY_POINT_PLACEHOLDER}:main'
@@ -75,6 +99,7 @@ class FileName():
     REPO_CONFIG = 'gen_repo.cfg'
     SETUP_CFG = 'setup.cfg'
     SETUP_PY = 'setup.py'
+    PYPROJECT = 'pyproject.toml'
     CHANGELOG = 'CHANGELOG.md'
     CHANGELOG_GENERATED = 'CHANGELOG_generated.md'
     CHANGELOG_PREPARED = 'CHANGELOG_prepared.md'
@@ -113,7 +138,14 @@ class FileName():
     CLOUD_CREDENTIALS = 'cloud_credentials.txt'
     REQUIREMENTS = 'requirements.txt'
     REQUIREMENTS_DEV = 'requirements-dev.txt'
+    REQUIREMENTS_LOCK = 'requirements.lock'
     REPOASSIST_README = 'REPOASSIST_README.md'
+    IMPORTS_CACHE = 'imports.json'
+    BUILD_CACHE_MANIFEST = 'manifest.json'
+    CHECKSUMS = 'SHA256SUMS'
+    ARTIFACTS_METADATA = 'artifacts.json'
+    DISTRIBUTIONS_CACHE = 'distributions_cache.json'
+    PYPI_CACHE = 'pypi_cache.json'
 
 
 class Tools():
@@ -148,8 +180,24 @@ class Config():
     metadata_section : str = METADATA_CONFIG_SECTION_NAME
     keywords : list = None
     is_git : bool = False
+    is_initial_commit : bool = False
     git_origin : str = ''
+    clone_filter : str = ''
+    clone_depth : int = None
+    clone_single_branch : bool = False
+    clone_reference : str = ''
     pipreqs_ignore : list = None
+    large_repo : bool = False
+    tag_prefix : str = ''
+    history_scope : list = None
+    pypi_index_url : str = ''
+    pypi_cache_ttl : int = None
+    pypi_offline : bool = False
+    clean_keep : list = None
+    reuse_build_backend : bool = False
+    build_timeout : int = None
+    build_cache : bool = True
+    artifacts_metadata : bool = False
     
     def __post_init__(self):
         setattr(self, REPOASSIST_VERSION, __version__)
@@ -291,4 +339,24 @@ DIRS_TO_CLEAN = [
     {'name': 'htmlcov', 'flag': '.'},
 ]
 
+CLEAN_MAX_WORKERS = 8
+CLEAN_GIT_KEEP = [FileName.CLOUD_CREDENTIALS, 'venv*', '.venv', DirName.CLEAN_TRASH]
+
 DEFAULT_REQUIREMENTS = ['setuptools']
+
+IMPORTS_SCAN_IGNORE_DIRS = ['.hg', '.svn', '.git', '.tox', '__pycache__', 'env', 'venv', '.ipynb_checkpoints',
+                            'site-packages', DirName.REPOASSIST_CACHE, DirName.CLEAN_TRASH]
+VIRTUALENV_CFG = 'pyvenv.cfg'
+IMPORTS_SCAN_EXTENSIONS = ['.py']
+IMPORTS_SCAN_PARALLEL_MIN_FILES = 64
+IMPORTS_CACHE_VERSION = 1
+DISTRIBUTIONS_IGNORED_TOP_LEVEL = ['tests', '_tests', 'test', 'testing']
+DISTRIBUTIONS_METADATA_SUFFIXES = ['.dist-info', '.egg-info', '.data']
+
+PYPI_INDEX_URL = 'https://pypi.org/pypi/'
+PYPI_CACHE_TTL_HOURS = 24
+PYPI_REQUEST_TIMEOUT = 10
+PYPI_REQUEST_RETRIES = 2
+PYPI_RETRY_BACKOFF = 0.5
+PYPI_MAX_CONNECTIONS = 8
+PYPI_MAX_REDIRECTS = 5
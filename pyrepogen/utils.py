@@ -2,13 +2,16 @@
 # -*- coding: utf-8 -*-
 
 
+import os
 import webbrowser
 import subprocess
 import configparser
 import platform
 import tempfile
+import threading
+import time
 from pathlib import Path, PureWindowsPath
-from collections import namedtuple
+from collections import namedtuple, deque
 
 from . import pygittools
 from . import settings
@@ -33,6 +36,67 @@ def execute_cmd(args, cwd='.'):
         return p.stdout
 
 
+def execute_cmd_streaming(args, cwd='.', output_handler=None, timeout=None, cancel_event=None, 
+                          tail_lines=settings.CMD_OUTPUT_TAIL_LINES):
+    output_handler = output_handler or _logger.info
+    tail = deque(maxlen=tail_lines)
+    p = subprocess.Popen(args,
+                         cwd=str(cwd),
+                         stdout=subprocess.PIPE,
+                         stderr=subprocess.STDOUT,
+                         encoding='utf-8',
+                         errors='replace')
+    
+    def forward_output():
+        for line in p.stdout:
+            line = line.rstrip('\r\n')
+            tail.append(line)
+            output_handler(line)
+    
+    reader = threading.Thread(target=forward_output, daemon=True)
+    reader.start()
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    try:
+        while True:
+            try:
+                p.wait(settings.CMD_POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if cancel_event is not None and cancel_event.is_set():
+                _kill_process(p, reader)
+                raise exceptions.ExecuteCmdCancelledError(p.returncode, 
+                                                          msg=_format_cmd_error('cancelled', args, tail), 
+                                                          logger=_logger)
+            if deadline is not None and time.monotonic() > deadline:
+                _kill_process(p, reader)
+                msg = _format_cmd_error(f'timed out after {timeout}s', args, tail)
+                raise exceptions.ExecuteCmdTimeoutError(p.returncode, msg=msg, logger=_logger)
+    except BaseException:
+        if p.poll() is None:
+            _kill_process(p, reader)
+        raise
+    
+    reader.join()
+    p.stdout.close()
+    if p.returncode:
+        msg = _format_cmd_error(f'failed with code {p.returncode}', args, tail)
+        raise exceptions.ExecuteCmdError(p.returncode, msg=msg, logger=_logger)
+    
+    return list(tail)
+
+
+def _kill_process(p, reader):
+    p.kill()
+    p.wait()
+    reader.join(settings.CMD_POLL_INTERVAL)
+    p.stdout.close()
+
+
+def _format_cmd_error(reason, args, tail):
+    return '\n'.join([f'Command {" ".join(str(arg) for arg in args)} {reason}:'] + list(tail))
+
+
 def execute_cmd_and_split_lines_to_list(args, cwd='.'):
     try:
         p = subprocess.run(args,
@@ -224,6 +288,18 @@ def get_latest_tarball(path):
     return None
 
 
+def get_user_cache_dir():
+    platform_name = platform.system()
+    if platform_name == 'Windows':
+        cache_root = Path(os.environ.get('LOCALAPPDATA', Path.home() / 'AppData' / 'Local'))
+    elif platform_name == 'Darwin':
+        cache_root = Path.home() / 'Library' / 'Caches'
+    else:
+        cache_root = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache'))
+    
+    return cache_root / settings.DirName.USER_CACHE
+
+
 def get_rel_path(path, cwd):
     return Path(path).resolve().relative_to(Path(cwd).resolve())
 
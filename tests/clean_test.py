@@ -2,12 +2,14 @@
 # -*- coding: utf-8 -*-
 
 
+import os
+import time
 import inspect
 import stat
 import shutil
 from pathlib import Path
 
-from pyrepogen import clean, logger
+from pyrepogen import clean, logger, settings, pygittools
 
 
 TESTS_SETUPS_PATH = Path(inspect.getframeinfo(inspect.currentframe()).filename).parent / 'tests_setups/clean_test'
@@ -207,3 +209,114 @@ def test_clean_dirs_SHOULD_delete_directories_properly():
             
     if Path(cwd).exists():
         shutil.rmtree(Path(cwd))
+
+
+def test_clean_SHOULD_not_descend_into_directories_scheduled_for_deletion(monkeypatch):
+    cwd = TESTS_SETUPS_PATH / 'test_clean_SHOULD_not_descend_into_directories_scheduled_for_deletion'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd))
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    
+    for path in {'venv23/lib/__pycache__', 'build/lib/__pycache__', 'sample/__pycache__', 'sample/nested'}:
+        Path(cwd / path).mkdir(parents=True, exist_ok=True)
+    _create_file_with_path(cwd, 'file.egg')
+    
+    scanned_dirs = []
+    scandir = os.scandir
+    def _scandir_spy(path):
+        scanned_dirs.append(Path(path).relative_to(Path(cwd).resolve()).as_posix())
+        return scandir(path)
+    monkeypatch.setattr(os, 'scandir', _scandir_spy)
+    files_paths, dirs_paths = clean._find_paths_to_clean(cwd, settings.FILES_TO_CLEAN, settings.DIRS_TO_CLEAN)
+    monkeypatch.undo()
+    
+    clean.clean(cwd)
+    
+    remaining_paths = sorted(path.relative_to(cwd).as_posix() for path in Path(cwd).rglob('*'))
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd))
+    
+    assert sorted(scanned_dirs) == ['.', 'sample', 'sample/nested']
+    assert [path.name for path in files_paths] == ['file.egg']
+    assert [path.relative_to(Path(cwd).resolve()).as_posix() for path in dirs_paths] == \
+        ['build', 'sample/__pycache__', 'venv23']
+    assert remaining_paths == ['sample', 'sample/nested']
+
+
+def test_clean_SHOULD_move_directories_to_trash_and_delete_them_in_the_background():
+    cwd = TESTS_SETUPS_PATH / 'test_clean_SHOULD_move_directories_to_trash_and_delete_them_in_the_background'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd))
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    
+    for index in range(20):
+        _create_file_with_path(cwd, f'venv23/lib/package{index}/module.py')
+    _create_file_with_path(cwd, 'sample/__pycache__/module.pyc')
+    _create_file_with_path(cwd, '__pycache__/module.pyc')
+    (cwd / 'venv23/lib/package0/module.py').chmod(stat.S_IREAD)
+    
+    clean.clean(cwd, wait=False)
+    paths_after_clean = sorted(path.name for path in Path(cwd).iterdir())
+    
+    for _ in range(100):
+        if not (cwd / settings.DirName.CLEAN_TRASH).exists():
+            break
+        time.sleep(0.1)
+    paths_after_deletion = sorted(path.relative_to(cwd).as_posix() for path in Path(cwd).rglob('*'))
+    
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd))
+    
+    assert paths_after_clean == [settings.DirName.CLEAN_TRASH, 'sample']
+    assert paths_after_deletion == ['sample']
+
+
+def test_clean_SHOULD_only_report_sizes_WHEN_dry_run():
+    cwd = TESTS_SETUPS_PATH / 'test_clean_SHOULD_only_report_sizes_WHEN_dry_run'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd))
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    
+    for index in range(10):
+        _create_file_with_path(cwd, f'venv23/lib/package{index}/module.py')
+        (cwd / f'venv23/lib/package{index}/module.py').write_bytes(b'0' * 10000 * (index + 1))
+    _create_file_with_path(cwd, 'file.egg')
+    _create_file_with_path(cwd, 'sample/module.py')
+    
+    def _get_disk_usage(path):
+        path_stat = os.lstat(path)
+        return path_stat.st_blocks * 512 if hasattr(path_stat, 'st_blocks') else path_stat.st_size
+    expected_venv_size = _get_disk_usage(cwd / 'venv23') + \
+        sum(_get_disk_usage(path) for path in (cwd / 'venv23').rglob('*'))
+    
+    report = clean.clean(cwd, dry_run=True)
+    paths_after_clean = sorted(path.name for path in Path(cwd).iterdir())
+    
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd))
+    
+    assert [(path.name, size) for path, size in report] == [('file.egg', 0), ('venv23', expected_venv_size)]
+    assert paths_after_clean == ['file.egg', 'sample', 'venv23']
+
+
+def test_clean_SHOULD_remove_git_ignored_paths_except_kept_ones_WHEN_git_mode():
+    cwd = TESTS_SETUPS_PATH / 'test_clean_SHOULD_remove_git_ignored_paths_except_kept_ones_WHEN_git_mode'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd))
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    pygittools.init(cwd)
+    
+    (cwd / '.gitignore').write_text('*.log\nbuild/\nvenv*/\ncloud_credentials.txt\n')
+    for path in ['debug.log', 'sample/trace.log', 'build/lib/module.py', 'build/important.txt',
+                 'venv23/lib/module.py', 'cloud_credentials.txt', 'sample/module.py', 'untracked.txt']:
+        _create_file_with_path(cwd, path)
+    
+    clean.clean(cwd, git_ignored=True, keep=['build/important.txt'])
+    
+    remaining_paths = sorted(path.relative_to(cwd).as_posix() for path in Path(cwd).rglob('*') 
+                             if '.git' not in path.relative_to(cwd).parts)
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), onerror=_error_remove_readonly)
+    
+    assert remaining_paths == ['.gitignore', 'build', 'build/important.txt', 'cloud_credentials.txt', 'sample', 
+                               'sample/module.py', 'untracked.txt', 'venv23', 'venv23/lib', 'venv23/lib/module.py']
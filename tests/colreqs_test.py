@@ -7,11 +7,18 @@ import inspect
 import os
 import stat
 import shutil
-from pathlib import Path
+import json
+import time
+import tempfile
+import threading
+import http.server
+from pathlib import Path, PurePosixPath
+from pipreqs import pipreqs
 
 from pyrepogen import logger
 _logger = logger.create_logger(name=None)
 from pyrepogen import colreqs
+from pyrepogen import pygittools
 from pyrepogen import settings
 from pyrepogen import PARDIR
 
@@ -35,6 +42,53 @@ def _error_remove_readonly(_action, name, _exc):
     os.remove(name)
     
 
+@pytest.fixture()
+def package_index():
+    requests = []
+    clients = set()
+    in_flight = {'current': 0, 'peak': 0}
+    in_flight_lock = threading.Lock()
+    
+    class IndexHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def do_GET(self):
+            with in_flight_lock:
+                in_flight['current'] += 1
+                in_flight['peak'] = max(in_flight['peak'], in_flight['current'])
+            try:
+                self._serve()
+            finally:
+                with in_flight_lock:
+                    in_flight['current'] -= 1
+        
+        def _serve(self):
+            requests.append(self.path)
+            clients.add(self.client_address)
+            name = self.path.split('/')[2]
+            if name == 'flaky_package' and requests.count(self.path) == 1:
+                self.send_error(503)
+            elif name.startswith(('existing_package', 'flaky_package')):
+                time.sleep(0.05)
+                content = json.dumps({'info': {'name': name, 'version': '1.2.3'}}).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Length', str(content.__len__()))
+                self.end_headers()
+                self.wfile.write(content)
+            else:
+                self.send_error(404)
+                
+        def log_message(self, *args):
+            pass
+    
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), IndexHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/pypi/', requests, clients, in_flight
+    server.shutdown()
+    server.server_close()
+    
+
 transform_to_min_testdata = [
     (
         ['setuptools==40.5.0', 'pytest==3.7.2', 'Jinja2==2.7.3'],
@@ -205,4 +259,257 @@ def test_write_requirements_dev_SHOULD_not_overwriting_reqs_if_exists(caplog):
     
     assert "requirements-dev.txt file already exists, not overwritten" in caplog.text
     assert ret_path == reqs_path
-    
\ No newline at end of file
+    
+    
+    
+def test_get_imports_info_SHOULD_serve_repeated_lookups_from_cache(package_index):
+    index_url, requests, _, _ = package_index
+    cache_path = Path(tempfile.mkdtemp()) / settings.FileName.PYPI_CACHE
+    
+    config = settings.Config(**_DEFAULT_CONFIG)
+    config.pypi_index_url = index_url
+    
+    imports_info = colreqs.get_imports_info(['existing_package', 'missing_package'], config, cache_path=cache_path)
+    imports_info_cached = colreqs.get_imports_info(['existing_package', 'missing_package'], config, 
+                                                   cache_path=cache_path)
+    
+    shutil.rmtree(cache_path.parent)
+    
+    assert imports_info == [{'name': 'existing_package', 'version': '1.2.3'}]
+    assert imports_info_cached == imports_info
+    assert sorted(requests) == ['/pypi/existing_package/json', '/pypi/missing_package/json']
+    
+    
+def test_get_imports_info_SHOULD_not_access_index_WHEN_offline(package_index):
+    index_url, requests, _, _ = package_index
+    cache_path = Path(tempfile.mkdtemp()) / settings.FileName.PYPI_CACHE
+    
+    config = settings.Config(**_DEFAULT_CONFIG)
+    config.pypi_index_url = index_url
+    config.pypi_cache_ttl = 0
+    
+    colreqs.get_imports_info(['existing_package'], config, cache_path=cache_path)
+    config.pypi_offline = True
+    imports_info = colreqs.get_imports_info(['existing_package', 'other_package'], config, cache_path=cache_path)
+    
+    shutil.rmtree(cache_path.parent)
+    
+    assert imports_info == [{'name': 'existing_package', 'version': '1.2.3'}]
+    assert requests == ['/pypi/existing_package/json']
+    
+    
+def test_get_all_imports_SHOULD_match_pipreqs_scan(monkeypatch):
+    project_path = Path(tempfile.mkdtemp())
+    (project_path / 'sample_project').mkdir()
+    (project_path / 'sample_project' / 'core.py').write_text('import os\nimport yaml.loader\nfrom . import utils\n')
+    (project_path / 'sample_project' / 'utils.py').write_text('from requests.adapters import HTTPAdapter\n')
+    (project_path / 'venv').mkdir()
+    (project_path / 'venv' / 'ignored.py').write_text('import numpy\n')
+    (project_path / settings.DirName.REPOASSIST).mkdir()
+    (project_path / settings.DirName.REPOASSIST / 'ignored.py').write_text('import jinja2\n')
+    (project_path / 'sample_project.py').write_text('import core\nimport sample_project\n')
+    
+    expected_imports = sorted(pipreqs.get_all_imports(str(project_path), 
+                                                      extra_ignore_dirs=[settings.DirName.REPOASSIST]))
+    imports = colreqs.get_all_imports(project_path, extra_ignore_dirs=[settings.DirName.REPOASSIST])
+    monkeypatch.setattr(settings, 'IMPORTS_SCAN_PARALLEL_MIN_FILES', 0)
+    monkeypatch.setattr(os, 'sched_getaffinity', lambda _pid: {0, 1}, raising=False)
+    imports_parallel = colreqs.get_all_imports(project_path, extra_ignore_dirs=[settings.DirName.REPOASSIST])
+    
+    shutil.rmtree(project_path)
+    
+    assert imports == expected_imports == ['requests', 'yaml']
+    assert imports_parallel == imports
+
+
+def test_get_all_imports_SHOULD_skip_symlinked_dirs_and_non_py_files():
+    project_path = Path(tempfile.mkdtemp())
+    (project_path / 'pkg').mkdir()
+    (project_path / 'pkg' / 'core.py').write_text('import yaml\n')
+    (project_path / 'pkg' / 'gui.pyw').write_text('import requests\n')
+    (project_path / 'pkg' / 'loop').symlink_to('..', target_is_directory=True)
+    
+    imports = colreqs.get_all_imports(project_path)
+    
+    shutil.rmtree(project_path)
+    
+    assert imports == ['yaml']
+    
+    
+def test_get_all_imports_SHOULD_parse_only_changed_files_WHEN_cache_exists(monkeypatch):
+    project_path = Path(tempfile.mkdtemp())
+    cache_path = project_path / settings.DirName.REPOASSIST_CACHE / settings.FileName.IMPORTS_CACHE
+    (project_path / 'core.py').write_text('import yaml\n')
+    (project_path / 'utils.py').write_text('import requests\n')
+    (project_path / 'other.py').write_text('import numpy\n')
+    
+    parsed_files = []
+    parse_imports = colreqs._parse_imports
+    def _parse_imports_spy(file_path):
+        parsed_files.append(Path(file_path).name)
+        return parse_imports(file_path)
+    monkeypatch.setattr(colreqs, '_parse_imports', _parse_imports_spy)
+    
+    imports_first = colreqs.get_all_imports(project_path, cache_path=cache_path)
+    parsed_first = sorted(parsed_files)
+    parsed_files.clear()
+    imports_cached = colreqs.get_all_imports(project_path, cache_path=cache_path)
+    parsed_cached = sorted(parsed_files)
+    (project_path / 'utils.py').write_text('import jinja2\n')
+    (project_path / 'other.py').unlink()
+    imports_updated = colreqs.get_all_imports(project_path, cache_path=cache_path)
+    
+    with open(cache_path) as file:
+        cached_files = sorted(json.load(file)['files'])
+    shutil.rmtree(project_path)
+    
+    assert imports_first == imports_cached == ['numpy', 'requests', 'yaml']
+    assert parsed_first == ['core.py', 'other.py', 'utils.py']
+    assert parsed_cached == []
+    assert parsed_files == ['utils.py']
+    assert imports_updated == ['jinja2', 'yaml']
+    assert cached_files == ['core.py', 'utils.py']
+    
+    
+def test_collect_reqs_specific_SHOULD_keep_imports_cache_in_given_cache_dir():
+    repo_path = Path(tempfile.mkdtemp())
+    (repo_path / 'sample_project').mkdir()
+    (repo_path / 'sample_project' / 'core.py').write_text('import os\n')
+    
+    config = settings.Config(**_DEFAULT_CONFIG)
+    colreqs.collect_reqs_specific(config, cwd=repo_path / 'sample_project', 
+                                  cache_dir=repo_path / settings.DirName.REPOASSIST_CACHE)
+    cache_exists = (repo_path / settings.DirName.REPOASSIST_CACHE / settings.FileName.IMPORTS_CACHE).exists()
+    package_files = sorted(path.name for path in (repo_path / 'sample_project').iterdir())
+    
+    shutil.rmtree(repo_path)
+    
+    assert cache_exists
+    assert package_files == ['core.py']
+    
+    
+def test_get_distributions_index_SHOULD_map_imports_to_installed_distributions(monkeypatch):
+    cache_path = Path(tempfile.mkdtemp()) / settings.FileName.DISTRIBUTIONS_CACHE
+    
+    index = colreqs.get_distributions_index(cache_path=cache_path)
+    monkeypatch.setattr(colreqs.importlib_metadata, 'distributions', lambda: pytest.fail('Index not cached'))
+    index_cached = colreqs.get_distributions_index(cache_path=cache_path)
+    
+    shutil.rmtree(cache_path.parent)
+    
+    assert index['imports']['_pytest'] == [{'name': 'pytest', 'version': pytest.__version__}]
+    assert index['imports']['pytest'] == index['imports']['_pytest']
+    assert index['distributions']['pytest'] == {'name': 'pytest', 'version': pytest.__version__}
+    assert index_cached == index
+    
+    
+def test_collect_reqs_specific_SHOULD_choose_single_distribution_per_import(monkeypatch):
+    distributions = {name: {'name': name, 'version': '1.0'} 
+                     for name in ['nsa', 'nsb', 'owna', 'ownb', 'mapx', 'Mapped-Dist']}
+    index = {
+        'imports': {
+            'ns': [distributions['nsb'], distributions['nsa']],
+            'owned': [distributions['owna'], distributions['ownb']],
+            'mapped': [distributions['mapx'], distributions['Mapped-Dist']],
+        },
+        'distributions': {colreqs._canonicalize_name(name): entry for name, entry in distributions.items()},
+    }
+    files = {
+        'nsa': ['ns/a/__init__.py'],
+        'nsb': ['ns/b/__init__.py'],
+        'owna': ['owned/plugins/a.py'],
+        'ownb': ['owned/__init__.py', 'owned/core.py'],
+    }
+    
+    class Distribution():
+        def __init__(self, name):
+            self.files = [PurePosixPath(file_path) for file_path in files.get(name, [])]
+    
+    monkeypatch.setattr(colreqs, 'get_all_imports', lambda *args, **kwargs: ['mapped', 'ns', 'owned'])
+    monkeypatch.setattr(colreqs, 'get_distributions_index', lambda: index)
+    monkeypatch.setattr(colreqs, '_load_pkg_names_mapping', lambda: {'mapped': 'mapped_dist'})
+    monkeypatch.setattr(colreqs.importlib_metadata, 'distribution', Distribution)
+    config = settings.Config(**_DEFAULT_CONFIG)
+    config.pypi_offline = True
+    
+    reqs = colreqs.collect_reqs_specific(config, cwd=Path(tempfile.gettempdir()))
+    
+    assert reqs == ['Mapped-Dist==1.0', 'nsa==1.0', 'ownb==1.0']
+    
+    
+def test_get_imports_info_SHOULD_fetch_concurrently_over_reused_connections(package_index, monkeypatch):
+    index_url, requests, clients, in_flight = package_index
+    cache_path = Path(tempfile.mkdtemp()) / settings.FileName.PYPI_CACHE
+    monkeypatch.setattr(settings, 'PYPI_MAX_CONNECTIONS', 4)
+    monkeypatch.setattr(settings, 'PYPI_RETRY_BACKOFF', 0)
+    names = [f'existing_package{i}' for i in range(40)] + ['flaky_package', 'missing_package']
+    
+    config = settings.Config(**_DEFAULT_CONFIG)
+    config.pypi_index_url = index_url
+    
+    imports_info = colreqs.get_imports_info(names, config, cache_path=cache_path)
+    
+    shutil.rmtree(cache_path.parent)
+    
+    assert imports_info == [{'name': name, 'version': '1.2.3'} for name in names[:-1]]
+    assert requests.count('/pypi/flaky_package/json') == 2
+    assert len(clients) <= 4 + 2
+    assert 1 < in_flight['peak'] <= 4
+    
+    
+def test_get_all_imports_SHOULD_skip_build_dirs_virtualenvs_and_git_ignored_paths():
+    project_path = Path(tempfile.mkdtemp())
+    pygittools.init(project_path)
+    (project_path / '.gitignore').write_text('generated/\nlocal_settings.py\n')
+    sources = {
+        'sample_project/core.py': 'import yaml\n',
+        'build/lib/core.py': 'import numpy\n',
+        'sample_venv/lib/module.py': 'import scipy\n',
+        'sample_venv/pyvenv.cfg': '',
+        'generated/module.py': 'import pandas\n',
+        'local_settings.py': 'import django\n',
+        'sample_project/.pytest_cache/module.py': 'import flask\n',
+    }
+    for file_path, content in sources.items():
+        (project_path / file_path).parent.mkdir(parents=True, exist_ok=True)
+        (project_path / file_path).write_text(content)
+    
+    imports = colreqs.get_all_imports(project_path)
+    
+    shutil.rmtree(project_path, onerror=_error_remove_readonly)
+    
+    assert imports == ['yaml']
+    
+    
+def test_get_all_imports_SHOULD_skip_root_only_dirs_only_at_repository_root():
+    repo_path = Path(tempfile.mkdtemp())
+    sources = {
+        'build/lib/core.py': 'import numpy\n',
+        'dist/module.py': 'import scipy\n',
+        'sample_project/build/__init__.py': 'import requests\n',
+        'sample_project/dist/__init__.py': 'import yaml\n',
+        'sample_project/__pycache__/module.py': 'import flask\n',
+    }
+    for file_path, content in sources.items():
+        (repo_path / file_path).parent.mkdir(parents=True, exist_ok=True)
+        (repo_path / file_path).write_text(content)
+    
+    package_imports = colreqs.get_all_imports(repo_path / 'sample_project', root_path=repo_path)
+    repo_imports = colreqs.get_all_imports(repo_path)
+    
+    shutil.rmtree(repo_path)
+    
+    assert package_imports == ['requests', 'yaml']
+    assert repo_imports == ['requests', 'yaml']
+    
+    
+def test_collect_reqs_lock_SHOULD_pin_installed_dependencies_closure():
+    reqs_lock = colreqs.collect_reqs_lock(['pytest>=3.7.2', 'pluggy', 'not_installed_package>=1.0'])
+    lock_names = [req.split('==')[0].lower() for req in reqs_lock]
+    
+    assert f'pytest=={pytest.__version__}' in reqs_lock
+    assert {'pluggy', 'iniconfig', 'packaging'} <= set(lock_names)
+    assert 'hypothesis' not in lock_names
+    assert 'not_installed_package>=1.0' in reqs_lock
+    assert lock_names == sorted(lock_names)
+    assert colreqs._get_distribution_requirements.cache_info().misses == len(reqs_lock)
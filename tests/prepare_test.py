@@ -15,6 +15,7 @@ from pyrepogen import settings
 from pyrepogen import utils
 from pyrepogen import PARDIR
 from pyrepogen import pygittools
+from pyrepogen import reltools
 
 
 TESTS_SETUPS_PATH = Path(inspect.getframeinfo(inspect.currentframe()).filename).parent / 'tests_setups/prepare_test'
@@ -485,6 +486,8 @@ def test_generate_module_repo_SHOULD_generate_makefile_without_cloud_properly():
         shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
         
     assert "make upload" not in makefile_content
+    assert "-m repoassist install $(INSTALL_ARGS)" in makefile_content
+    assert "setup.py install" not in makefile_content
     
 
 @pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
@@ -689,3 +692,91 @@ def test_update_repoassist_SHOULD_add_new_files_to_repo_tree_and_remove_old_from
     pprint(repo_tree)
     
     assert set(repo_tree) == set(repoassist_paths_expected)
+    
+    
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_generate_repo_SHOULD_make_shallow_clone_and_complete_history_on_release(cwd):
+    origin_path = cwd / 'origin_repo'
+    origin_path.mkdir()
+    pygittools.init(origin_path)
+    for i in range(3):
+        (origin_path / settings.FileName.README).write_text(f'Version {i}')
+        pygittools.add(origin_path / settings.FileName.README, origin_path)
+        pygittools.commit(f'Commit {i}', origin_path)
+    pygittools.set_tag('0.1.0', 'First Release', origin_path)
+    
+    config = settings.Config(**_DEFAULT_CONFIG)
+    config.is_git = True
+    config.git_origin = f'file://{origin_path.as_posix()}'
+    config.clone_depth = 1
+    config.clone_single_branch = True
+    
+    options = Args()
+    options.force = True
+    options.cloud = False
+    
+    repo_path = cwd / 'generated' / origin_path.name
+    prepare.generate_repo(config, repo_path, options)
+    
+    assert pygittools.is_shallow_repo(repo_path)
+    assert pygittools.get_commits_count(repo_path) == 1
+    
+    assert reltools.complete_shallow_history(repo_path)
+    
+    assert not pygittools.is_shallow_repo(repo_path)
+    assert pygittools.get_commits_count(repo_path) == 3
+    assert pygittools.get_latest_tag(repo_path) == '0.1.0'
+    
+    
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_generate_package_repo_SHOULD_commit_generated_files_WHEN_initial_commit_choosen(cwd):
+    config = settings.Config(**_DEFAULT_CONFIG)
+    config.project_type = settings.ProjectType.PACKAGE.value
+    config.is_sample_layout = True
+    config.is_git = True
+    config.is_initial_commit = True
+    
+    args = Args
+    args.force = False
+    args.cloud = True
+    
+    paths = prepare.generate_repo(config, cwd, options=args)
+    paths = {path.relative_to(cwd).as_posix() for path in paths \
+             if path.is_file() and settings.FileName.CLOUD_CREDENTIALS not in path.__str__()}
+    
+    repo_paths = utils.get_git_repo_tree(cwd)
+    repo_paths = {path.relative_to(cwd).as_posix() for path in repo_paths}
+    pprint(repo_paths)
+    
+    assert paths == repo_paths
+    assert pygittools.get_commits_count(cwd) == 1
+    assert not pygittools.are_uncommited_changes(cwd)
+    assert pygittools.get_authors(cwd) == [f'{config.author} <{config.author_email}>']
+    assert utils.execute_cmd(['git', 'status', '--porcelain'], cwd).strip() == ''
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_commit_untracked_files_SHOULD_commit_modified_tracked_files_with_file_modes(cwd):
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    pygittools.init(cwd)
+    (Path(cwd) / 'README.md').write_text('old\n')
+    (Path(cwd) / 'removed.txt').write_text('removed\n')
+    pygittools.add(Path(cwd) / 'README.md', cwd)
+    pygittools.add(Path(cwd) / 'removed.txt', cwd)
+    pygittools.commit('Initial Commit', cwd)
+    
+    (Path(cwd) / 'README.md').write_text('new\n')
+    (Path(cwd) / 'removed.txt').unlink()
+    (Path(cwd) / 'tools').mkdir()
+    (Path(cwd) / 'tools' / 'run.sh').write_text('#!/bin/sh\n')
+    (Path(cwd) / 'tools' / 'run.sh').chmod(0o755)
+    pygittools.commit_untracked_files([Path(cwd) / 'README.md', Path(cwd) / 'removed.txt', Path(cwd) / 'tools'], 
+                                      'Generated files', 'Author', 'author@mail.com', cwd)
+    
+    tree = utils.execute_cmd(['git', 'ls-tree', '-r', 'HEAD'], cwd).splitlines()
+    
+    assert utils.execute_cmd(['git', 'status', '--porcelain'], cwd).strip() == ''
+    assert pygittools.get_commits_count(cwd) == 2
+    assert utils.execute_cmd(['git', 'show', 'HEAD:README.md'], cwd) == 'new\n'
+    assert [(line.split()[0], line.split('\t')[1]) for line in tree] == [('100644', 'README.md'), 
+                                                                         ('100755', 'tools/run.sh')]
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import pytest
+import inspect
+import os
+import stat
+import shutil
+from pathlib import Path
+
+from pyrepogen import logger
+_logger = logger.create_logger(name=None)
+from pyrepogen import pygittools
+from pyrepogen import utils
+
+
+TESTS_SETUPS_PATH = Path(inspect.getframeinfo(inspect.currentframe()).filename).parent / 'tests_setups/pygittools_test'
+SKIP_ALL_MARKED = False
+
+
+def _error_remove_readonly(_action, name, _exc):
+    os.chmod(name, stat.S_IWRITE)
+    os.remove(name)
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_submodules_api_SHOULD_update_and_report_status_in_gitmodules_order(monkeypatch):
+    cwd = TESTS_SETUPS_PATH / 'test_submodules_api_SHOULD_update_and_report_status_in_gitmodules_order'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    monkeypatch.setenv('GIT_CONFIG_COUNT', '1')
+    monkeypatch.setenv('GIT_CONFIG_KEY_0', 'protocol.file.allow')
+    monkeypatch.setenv('GIT_CONFIG_VALUE_0', 'always')
+    
+    for name in ['sub_b', 'sub_a']:
+        (Path(cwd) / name).mkdir()
+        pygittools.init(Path(cwd) / name)
+        (Path(cwd) / name / 'file.txt').write_text(f'{name}\n')
+        pygittools.add(Path(cwd) / name / 'file.txt', Path(cwd) / name)
+        pygittools.commit('Initial Commit', Path(cwd) / name)
+    super_path = Path(cwd) / 'super'
+    super_path.mkdir()
+    pygittools.init(super_path)
+    for name, path in [('sub_b', 'libs/b'), ('sub_a', 'libs/a')]:
+        utils.execute_cmd(['git', '-c', 'protocol.file.allow=always', 'submodule', 'add', 
+                           str((Path(cwd) / name).resolve()), path], super_path)
+    pygittools.commit('Add submodules', super_path)
+    (Path(cwd) / 'sub_a' / 'file.txt').write_text('sub_a updated\n')
+    pygittools.add(Path(cwd) / 'sub_a' / 'file.txt', Path(cwd) / 'sub_a')
+    pygittools.commit('Update', Path(cwd) / 'sub_a')
+    
+    pygittools.set_submodule_fetch_jobs(2, super_path)
+    fetch_jobs = utils.execute_cmd(['git', 'config', 'submodule.fetchJobs'], super_path).strip()
+    submodules = pygittools.list_submodules(super_path)
+    update_progress = []
+    update_results = pygittools.update_submodules(jobs=2, cwd=super_path,
+                                                  progress=lambda result, done, total: 
+                                                      update_progress.append((result.path, done, total)))
+    updated_file = (super_path / 'libs' / 'a' / 'file.txt').read_text()
+    utils.execute_cmd(['git', 'submodule', 'deinit', '--force', 'libs/a'], super_path)
+    (super_path / 'libs' / 'b' / 'file.txt').write_text('dirty\n')
+    status_progress = []
+    statuses = pygittools.get_submodules_status(jobs=2, cwd=super_path,
+                                                progress=lambda status, done, total: 
+                                                    status_progress.append((done, total)))
+    sub_b_commit = utils.execute_cmd(['git', 'rev-parse', 'HEAD'], Path(cwd) / 'sub_b').strip()
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert fetch_jobs == '2'
+    assert submodules == ['libs/b', 'libs/a']
+    assert [(result.path, result.returncode) for result in update_results] == [('libs/b', 0), ('libs/a', 0)]
+    assert sorted(path for path, _, _ in update_progress) == ['libs/a', 'libs/b']
+    assert [(done, total) for _, done, total in update_progress] == [(1, 2), (2, 2)]
+    assert updated_file == 'sub_a updated\n'
+    assert [status.path for status in statuses] == ['libs/b', 'libs/a']
+    assert statuses[0].is_initialized and statuses[0].is_dirty and statuses[0].commit == sub_b_commit
+    assert statuses[1] == pygittools.SubmoduleStatus('libs/a', None, None, False, False)
+    assert status_progress == [(1, 2), (2, 2)]
@@ -6,10 +6,19 @@ import pytest
 import inspect
 import shutil
 import os
+import sys
 import stat
 import re
 import datetime
 import time
+import json
+import logging
+import hashlib
+import tarfile
+import zipfile
+import threading
+import io
+import zlib
 from pathlib import Path
 from pprint import pprint
 from pbr import git
@@ -587,3 +596,668 @@ def test_update_version_module_SHOULD_rise_error_when_no_version_in_module():
             shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
         assert "__version__ variable not found in the sample_project.py file" in str(e)
     
+        
+        
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_refresh_history_indexes_SHOULD_write_commit_graph_only_when_stale():
+    cwd = TESTS_SETUPS_PATH / 'test_refresh_history_indexes_SHOULD_write_commit_graph_only_when_stale'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    
+    options = Args()
+    options.force = True
+    
+    config = settings.Config(**_DEFAULT_CONFIG)
+    paths = prepare.generate_repo(config, cwd, options)
+    pygittools.init(cwd)
+    for path in paths:
+        pygittools.add(path, cwd)
+    pygittools.commit("Initial Commit", cwd)
+    
+    assert pygittools.is_commit_graph_stale(cwd)
+    assert reltools.refresh_history_indexes(cwd)
+    assert not pygittools.is_commit_graph_stale(cwd)
+    assert not reltools.refresh_history_indexes(cwd)
+
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_refresh_history_indexes_SHOULD_not_measure_history_walk_WHEN_debug_disabled(monkeypatch):
+    cwd = TESTS_SETUPS_PATH / 'test_refresh_history_indexes_SHOULD_not_measure_history_walk_WHEN_debug_disabled'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    
+    pygittools.init(cwd)
+    (Path(cwd) / 'file.txt').write_text('content\n')
+    pygittools.add(Path(cwd) / 'file.txt', cwd)
+    pygittools.commit("Initial Commit", cwd)
+    walks = []
+    monkeypatch.setattr(pygittools, 'get_commits_count', lambda *args, **kwargs: walks.append(args) or 1)
+    reltools._logger.setLevel(logging.INFO)
+    try:
+        is_refreshed = reltools.refresh_history_indexes(cwd)
+    finally:
+        reltools._logger.setLevel(logging.NOTSET)
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert is_refreshed
+    assert walks == []
+        
+        
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_make_release_SHOULD_release_package_in_monorepo_with_tag_prefix():
+    cwd = TESTS_SETUPS_PATH / 'test_make_release_SHOULD_release_package_in_monorepo_with_tag_prefix'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    package_cwd = Path(cwd) / 'package_a'
+    package_cwd.mkdir()
+    
+    config = settings.Config(**_DEFAULT_CONFIG)
+    config.project_type = settings.ProjectType.PACKAGE.value
+    config.is_sample_layout = True
+    config.tag_prefix = 'package_a-'
+    
+    options = Args()
+    options.force = True
+    options.cloud = True
+    
+    release_data = ReleaseData()
+    release_data.tag = '0.2.0'
+    release_data.msg = 'Next Release'
+    
+    paths = prepare.generate_repo(config, package_cwd, options)
+    
+    pygittools.init(cwd)
+    for path in paths:
+        try:
+            pygittools.add(path, cwd)
+        except pygittools.PygittoolsError:
+            pass
+    pygittools.commit("Initial Commit", cwd)
+    pygittools.set_tag('package_a-0.1.0', "First Release", cwd)
+    
+    other_path = Path(cwd) / 'package_b' / settings.FileName.README
+    other_path.parent.mkdir()
+    other_path.write_text('package_b')
+    pygittools.add(other_path, cwd)
+    utils.execute_cmd(['git', '-c', 'user.name=Other', '-c', 'user.email=other@mail.com', 
+                       'commit', '-m', 'Package B Commit'], cwd)
+    pygittools.set_tag('package_b-5.0.0', "Package B Release", cwd)
+    
+    time.sleep(1) # Sleep for different release time than previous
+    
+    archive_name = release.make_release(action=release.ReleaseAction.MAKE_RELEASE,
+                                        prompt=False, 
+                                        push=False,
+                                        release_data=release_data,
+                                        cwd=package_cwd)
+    
+    authors = (package_cwd / settings.FileName.AUTHORS).read_text()
+    changelog = (package_cwd / settings.FileName.CHANGELOG).read_text()
+    
+    assert '0.2.0' in Path(archive_name).name
+    assert pygittools.get_latest_tag(cwd, tag_prefix='package_a-') == 'package_a-0.2.0'
+    assert 'Other' not in authors
+    assert 'package_a-0.1.0' in changelog
+    assert 'package_b-5.0.0' not in changelog
+    assert not pygittools.are_uncommited_changes(cwd)
+
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_build_distributions_SHOULD_return_built_artifacts_and_reuse_backend_WHEN_requested():
+    cwd = TESTS_SETUPS_PATH / 'test_build_distributions_SHOULD_return_built_artifacts_and_reuse_backend_WHEN_requested'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    
+    (Path(cwd) / settings.FileName.SETUP_PY).write_text("import os\n"
+                                                        "from setuptools import setup\n"
+                                                        "setup(name='sample_project', "
+                                                        "version=os.environ.get('PBR_VERSION', '0.0.1'), "
+                                                        "py_modules=['sample_project'])\n")
+    (Path(cwd) / 'sample_project.py').write_text("__version__ = '0.0.1'\n")
+    
+    first_paths = release._build_distributions('0.1.0', reuse_backend=True, cwd=cwd)
+    first_runners = list(release._hook_runners.values())
+    second_paths = release._build_distributions('0.2.0', reuse_backend=True, cwd=cwd)
+    second_runners = list(release._hook_runners.values())
+    release._close_hook_runners()
+    
+    dist_files = sorted(path.name for path in (Path(cwd) / settings.DirName.DISTRIBUTION).iterdir())
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert [path.name for path in first_paths] == ['sample_project-0.1.0.tar.gz', 
+                                                   'sample_project-0.1.0-py3-none-any.whl']
+    assert [path.name for path in second_paths] == ['sample_project-0.2.0.tar.gz', 
+                                                    'sample_project-0.2.0-py3-none-any.whl']
+    assert len(first_runners) == 2 and first_runners == second_runners
+    assert dist_files == sorted([path.name for path in first_paths + second_paths])
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_make_release_SHOULD_restore_regenerated_package_from_build_cache(monkeypatch):
+    cwd = TESTS_SETUPS_PATH / 'test_make_release_SHOULD_restore_regenerated_package_from_build_cache'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    cache_path = Path(cwd) / 'user_cache'
+    monkeypatch.setattr(utils, 'get_user_cache_dir', lambda: cache_path)
+    
+    config = settings.Config(**_DEFAULT_CONFIG)
+    config.project_type = settings.ProjectType.PACKAGE.value
+    config.is_sample_layout = True
+    
+    options = Args()
+    options.force = True
+    options.cloud = True
+    
+    release_data = ReleaseData()
+    release_data.tag = '0.2.0'
+    release_data.msg = 'Next Release'
+    
+    repo_path = Path(cwd) / 'repo'
+    paths = prepare.generate_repo(config, repo_path, options)
+    pygittools.init(repo_path)
+    for path in paths:
+        try:
+            pygittools.add(path, repo_path)
+        except pygittools.PygittoolsError:
+            pass
+    pygittools.commit("Initial Commit", repo_path)
+    pygittools.set_tag('0.1.0', "First Release", repo_path)
+    
+    archive_name = release.make_release(action=release.ReleaseAction.MAKE_RELEASE, prompt=False, push=False,
+                                        release_data=release_data, cwd=repo_path)
+    archive_content = Path(archive_name).read_bytes()
+    shutil.rmtree(Path(repo_path) / settings.DirName.DISTRIBUTION)
+    
+    monkeypatch.setattr(release, '_build_distributions', lambda *args, **kwargs: pytest.fail('Cache not used'))
+    archive_name_regenerated = release.make_release(action=release.ReleaseAction.REGENERATE, prompt=False, 
+                                                    push=False, cwd=repo_path)
+    dist_files = sorted(path.name for path in (Path(repo_path) / settings.DirName.DISTRIBUTION).iterdir())
+    archive_regenerated_content = Path(archive_name_regenerated).read_bytes()
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert archive_name_regenerated == archive_name
+    assert archive_regenerated_content == archive_content
+    assert dist_files == [settings.FileName.CHECKSUMS, 'sample_project-0.2.0-py3-none-any.whl', 
+                          'sample_project-0.2.0.tar.gz']
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_prepare_isolated_tree_SHOULD_link_project_without_build_outputs():
+    cwd = TESTS_SETUPS_PATH / 'test_prepare_isolated_tree_SHOULD_link_project_without_build_outputs'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    (Path(cwd) / settings.DirName.DISTRIBUTION).mkdir(parents=True)
+    (Path(cwd) / 'sample_project' / '__pycache__').mkdir(parents=True)
+    (Path(cwd) / settings.FileName.SETUP_PY).write_text("from setuptools import setup\nsetup()\n")
+    (Path(cwd) / 'sample_project' / '__init__.py').write_text("__version__ = '0.0.1'\n")
+    (Path(cwd) / 'sample_project' / '__pycache__' / '__init__.pyc').write_bytes(b'')
+    (Path(cwd) / 'sample_project.egg-info').mkdir()
+    tree_path = Path(cwd) / settings.DirName.DISTRIBUTION / '.wheel-tree'
+    tree_path.mkdir()
+    
+    isolated_path, env = release._prepare_isolated_tree(tree_path, {'PBR_VERSION': '0.1.0'}, cwd)
+    isolated_files = sorted(path.relative_to(isolated_path).as_posix() for path in isolated_path.rglob('*'))
+    is_linked = (isolated_path / settings.FileName.SETUP_PY).samefile(Path(cwd) / settings.FileName.SETUP_PY)
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert isolated_files == ['sample_project', 'sample_project/__init__.py', settings.FileName.SETUP_PY]
+    assert is_linked
+    assert env['PBR_VERSION'] == '0.1.0'
+    assert Path(env['GIT_WORK_TREE']).parent == tree_path
+    assert isolated_path.as_posix().startswith(Path(env['GIT_WORK_TREE']).as_posix() + '/')
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_build_distributions_SHOULD_produce_identical_artifacts_WHEN_rebuilt_with_same_source_date_epoch():
+    cwd = TESTS_SETUPS_PATH / 'test_build_distributions_SHOULD_produce_identical_artifacts_WHEN_rebuilt_with_same_source_date_epoch'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    
+    (Path(cwd) / settings.FileName.SETUP_PY).write_text("import os\n"
+                                                        "from setuptools import setup\n"
+                                                        "setup(name='sample_project', "
+                                                        "version=os.environ.get('PBR_VERSION', '0.0.1'), "
+                                                        "py_modules=['sample_project'])\n")
+    (Path(cwd) / 'sample_project.py').write_text("__version__ = '0.0.1'\n")
+    
+    first_hashes = [release._get_file_sha256(path) 
+                    for path in release._build_distributions('0.1.0', source_date_epoch=1500000000, cwd=cwd)]
+    os.utime(Path(cwd) / 'sample_project.py', (1600000000, 1600000000))
+    (Path(cwd) / 'sample_project.py').chmod(0o600)
+    paths = release._build_distributions('0.1.0', source_date_epoch=1500000000, cwd=cwd)
+    second_hashes = [release._get_file_sha256(path) for path in paths]
+    with tarfile.open(paths[0]) as sdist:
+        sdist_members = [(member.name, member.mtime, member.mode, member.uid) for member in sdist.getmembers()]
+    with zipfile.ZipFile(paths[1]) as wheel:
+        wheel_date_times = {info.date_time for info in wheel.infolist()}
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert first_hashes == second_hashes
+    assert [name for name, _, _, _ in sdist_members] == sorted(name for name, _, _, _ in sdist_members)
+    assert {(mtime, uid) for _, mtime, _, uid in sdist_members} == {(1500000000, 0)}
+    assert {mode for _, _, mode, _ in sdist_members} <= {0o644, 0o755}
+    assert wheel_date_times == {time.gmtime(1500000000)[:6]}
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_prepare_archive_SHOULD_produce_identical_archives_WHEN_source_date_epoch_is_same():
+    cwd = TESTS_SETUPS_PATH / 'test_prepare_archive_SHOULD_produce_identical_archives_WHEN_source_date_epoch_is_same'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    (Path(cwd) / 'src' / 'pkg').mkdir(parents=True)
+    (Path(cwd) / 'src' / 'pkg' / 'b.py').write_text('b = 2\n')
+    (Path(cwd) / 'src' / 'pkg' / 'a.py').write_text('a = 1\n')
+    (Path(cwd) / 'src' / 'run.sh').write_text('#!/bin/sh\n')
+    (Path(cwd) / 'src' / 'run.sh').chmod(0o775)
+    files = [Path(cwd) / 'src' / 'pkg', Path(cwd) / 'src' / 'run.sh']
+    
+    digests = {}
+    for extension in ['zip', 'tar']:
+        first_path = reltools.prepare_archive('first', 'dist', files, files_root=Path(cwd) / 'src', 
+                                              extension=extension, source_date_epoch=1500000000, cwd=cwd)
+        os.utime(Path(cwd) / 'src' / 'pkg' / 'a.py', (1600000000, 1600000000))
+        second_path = reltools.prepare_archive('second', 'dist', files, files_root=Path(cwd) / 'src', 
+                                               extension=extension, source_date_epoch=1500000000, cwd=cwd)
+        digests[extension] = [release._get_file_sha256(first_path), release._get_file_sha256(second_path)]
+    with zipfile.ZipFile(Path(cwd) / 'dist' / 'first.zip') as archive:
+        zip_entries = [(info.filename, info.external_attr >> 16 & 0o777) for info in archive.infolist()]
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert digests['zip'][0] == digests['zip'][1]
+    assert digests['tar'][0] == digests['tar'][1]
+    assert zip_entries == [('pkg/', 0o755), ('pkg/a.py', 0o644), ('pkg/b.py', 0o644), ('run.sh', 0o755)]
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_make_install_SHOULD_install_release_wheel_from_dist_without_rebuilding(monkeypatch):
+    cwd = TESTS_SETUPS_PATH / 'test_make_install_SHOULD_install_release_wheel_from_dist_without_rebuilding'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    monkeypatch.setattr(utils, 'get_user_cache_dir', lambda: Path(cwd) / 'user_cache')
+    
+    config = settings.Config(**_DEFAULT_CONFIG)
+    config.project_type = settings.ProjectType.PACKAGE.value
+    config.is_sample_layout = True
+    
+    options = Args()
+    options.force = True
+    options.cloud = True
+    
+    release_data = ReleaseData()
+    release_data.tag = '0.2.0'
+    release_data.msg = 'Next Release'
+    
+    repo_path = Path(cwd) / 'repo'
+    paths = prepare.generate_repo(config, repo_path, options)
+    pygittools.init(repo_path)
+    for path in paths:
+        try:
+            pygittools.add(path, repo_path)
+        except pygittools.PygittoolsError:
+            pass
+    pygittools.commit("Initial Commit", repo_path)
+    pygittools.set_tag('0.1.0', "First Release", repo_path)
+    release.make_release(action=release.ReleaseAction.MAKE_RELEASE, prompt=False, push=False,
+                         release_data=release_data, cwd=repo_path)
+    
+    commands = []
+    monkeypatch.setattr(release, '_build_distributions', lambda *args, **kwargs: pytest.fail('Wheel not reused'))
+    monkeypatch.setattr(utils, 'execute_cmd_streaming', lambda args, *_args, **_kwargs: commands.append(args))
+    release.make_install(cwd=repo_path)
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert len(commands) == 1
+    assert commands[0][1:4] == ['-m', 'pip', 'install']
+    assert '--no-index' in commands[0] and '--no-deps' in commands[0]
+    assert Path(commands[0][-1]) == (repo_path / settings.DirName.DISTRIBUTION 
+                                     / 'sample_project-0.2.0-py3-none-any.whl').resolve()
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_write_checksums_SHOULD_write_sha256sums_and_metadata_of_existing_artifacts(monkeypatch):
+    cwd = TESTS_SETUPS_PATH / 'test_write_checksums_SHOULD_write_sha256sums_and_metadata_of_existing_artifacts'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    dist_path = Path(cwd) / settings.DirName.DISTRIBUTION
+    dist_path.mkdir(parents=True)
+    monkeypatch.setattr(settings, 'HASH_MMAP_MIN_SIZE', 1024)
+    
+    contents = {'old-0.1.0.tar.gz': b'old', 'removed-0.0.1.tar.gz': b'removed', 
+                'new-0.2.0.tar.gz': b'sdist', 'new-0.2.0-py3-none-any.whl': bytes(range(256)) * 64, 
+                'empty-0.2.0.txt': b''}
+    for name, content in contents.items():
+        (dist_path / name).write_bytes(content)
+    release._write_checksums([dist_path / 'old-0.1.0.tar.gz', dist_path / 'removed-0.0.1.tar.gz'], 
+                             release_tag='0.1.0', with_metadata=True, cwd=cwd)
+    (dist_path / 'removed-0.0.1.tar.gz').unlink()
+    new_paths = [dist_path / 'new-0.2.0.tar.gz', dist_path / 'new-0.2.0-py3-none-any.whl', dist_path / 'empty-0.2.0.txt']
+    checksums_path = release._write_checksums(new_paths, release_tag='0.2.0', with_metadata=True, cwd=cwd)
+    checksums = checksums_path.read_text().splitlines()
+    metadata = json.loads((dist_path / settings.FileName.ARTIFACTS_METADATA).read_text())
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert checksums == [f'{hashlib.sha256(contents[name]).hexdigest()}  {name}' 
+                         for name in ['empty-0.2.0.txt', 'new-0.2.0-py3-none-any.whl', 'new-0.2.0.tar.gz', 
+                                      'old-0.1.0.tar.gz']]
+    assert sorted(metadata) == ['empty-0.2.0.txt', 'new-0.2.0-py3-none-any.whl', 'new-0.2.0.tar.gz', 'old-0.1.0.tar.gz']
+    assert metadata['new-0.2.0-py3-none-any.whl']['size'] == 256 * 64
+    assert metadata['new-0.2.0.tar.gz']['tag'] == '0.2.0' and metadata['old-0.1.0.tar.gz']['tag'] == '0.1.0'
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_prepare_archive_SHOULD_stream_files_and_add_in_memory_entries(monkeypatch):
+    cwd = TESTS_SETUPS_PATH / 'test_prepare_archive_SHOULD_stream_files_and_add_in_memory_entries'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    (Path(cwd) / 'src' / 'pkg').mkdir(parents=True)
+    (Path(cwd) / 'src' / 'pkg' / 'module.py').write_text('value = 1\n' * 1000)
+    (Path(cwd) / 'src' / 'doc' / 'guide').mkdir(parents=True)
+    (Path(cwd) / 'src' / 'doc' / 'guide' / 'index.md').write_text('# Guide\n')
+    copied_paths = []
+    monkeypatch.setattr(shutil, 'copy', lambda *args, **kwargs: copied_paths.append(args))
+    monkeypatch.setattr(shutil, 'copytree', lambda *args, **kwargs: copied_paths.append(args))
+    
+    def extra_entries(add_entry):
+        add_entry('version.txt', '0.1.0\n')
+        add_entry('bin/run', b'#!/bin/sh\n', mode=0o755)
+    
+    archives_paths = [reltools.prepare_archive(f'archive_{level}', 'dist', 
+                                               [Path(cwd) / 'src' / 'pkg', Path(cwd) / 'src' / 'doc' / 'guide' / 'index.md'], 
+                                               files_root=Path(cwd) / 'src', extra_entries=extra_entries, 
+                                               source_date_epoch=1500000000, compression_level=level, cwd=cwd) 
+                      for level in [0, 9]]
+    with zipfile.ZipFile(archives_paths[1]) as archive:
+        entries = {info.filename: (info.external_attr >> 16 & 0o777, archive.read(info)) for info in archive.infolist()}
+    sizes = [path.stat().st_size for path in archives_paths]
+    dist_files = sorted(path.name for path in (Path(cwd) / 'dist').iterdir())
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert not copied_paths
+    assert dist_files == ['archive_0.zip', 'archive_9.zip']
+    assert sizes[1] < sizes[0]
+    assert sorted(entries) == ['bin/', 'bin/run', 'doc/', 'doc/guide/', 'doc/guide/index.md', 'pkg/', 'pkg/module.py', 
+                               'version.txt']
+    assert entries['bin/run'] == (0o755, b'#!/bin/sh\n')
+    assert entries['version.txt'] == (0o644, b'0.1.0\n')
+    assert entries['pkg/module.py'][1] == b'value = 1\n' * 1000
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_prepare_archive_SHOULD_store_symlinks_under_their_own_names():
+    cwd = TESTS_SETUPS_PATH / 'test_prepare_archive_SHOULD_store_symlinks_under_their_own_names'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    (Path(cwd) / 'src' / 'pkg').mkdir(parents=True)
+    (Path(cwd) / 'outside.txt').write_text('outside\n')
+    (Path(cwd) / 'src' / 'pkg' / 'inside.txt').write_text('inside\n')
+    (Path(cwd) / 'src' / 'pkg' / 'link_in.txt').symlink_to(Path(cwd) / 'src' / 'pkg' / 'inside.txt')
+    (Path(cwd) / 'src' / 'pkg' / 'link_out.txt').symlink_to(Path(cwd) / 'outside.txt')
+    
+    archive_path = reltools.prepare_archive('archive', 'dist', [Path(cwd) / 'src' / 'pkg'], files_root=Path(cwd) / 'src', 
+                                            source_date_epoch=1500000000, cwd=cwd)
+    with zipfile.ZipFile(archive_path) as archive:
+        entries = {info.filename: archive.read(info) for info in archive.infolist()}
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert sorted(entries) == ['pkg/', 'pkg/inside.txt', 'pkg/link_in.txt', 'pkg/link_out.txt']
+    assert entries['pkg/link_in.txt'] == b'inside\n'
+    assert entries['pkg/link_out.txt'] == b'outside\n'
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_prepare_archive_SHOULD_add_files_written_to_staging_dir_by_add_extra_files():
+    cwd = TESTS_SETUPS_PATH / 'test_prepare_archive_SHOULD_add_files_written_to_staging_dir_by_add_extra_files'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    (Path(cwd) / 'src').mkdir(parents=True)
+    (Path(cwd) / 'src' / 'version.txt').write_text('0.0.0\n')
+    (Path(cwd) / 'src' / 'module.py').write_text('value = 1\n')
+    staging_dirs = []
+    
+    def add_extra_files(staging_dir):
+        staging_dirs.append(staging_dir)
+        (staging_dir / 'version.txt').write_text('0.1.0\n')
+        (staging_dir / 'data').mkdir()
+        (staging_dir / 'data' / 'config.json').write_text('{}')
+    
+    archive_path = reltools.prepare_archive('archive', 'dist', [Path(cwd) / 'src' / 'version.txt', Path(cwd) / 'src' / 'module.py'], 
+                                            files_root=Path(cwd) / 'src', add_extra_files=add_extra_files, 
+                                            extra_entries={'README': 'readme\n'}, source_date_epoch=1500000000, cwd=cwd)
+    with zipfile.ZipFile(archive_path) as archive:
+        entries = {info.filename: archive.read(info) for info in archive.infolist()}
+    dist_files = sorted(path.name for path in (Path(cwd) / 'dist').iterdir())
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert len(staging_dirs) == 1 and not staging_dirs[0].exists()
+    assert dist_files == ['archive.zip']
+    assert sorted(entries) == ['README', 'data/', 'data/config.json', 'module.py', 'version.txt']
+    assert entries['version.txt'] == b'0.1.0\n'
+    assert entries['data/config.json'] == b'{}'
+    assert entries['README'] == b'readme\n'
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+@pytest.mark.parametrize('extension, mode', [('tar.gz', 'r:gz'), ('tar.xz', 'r:xz')])
+def test_prepare_archive_SHOULD_compress_tar_in_independent_blocks(monkeypatch, extension, mode):
+    cwd = TESTS_SETUPS_PATH / f'test_prepare_archive_SHOULD_compress_tar_in_independent_blocks_{extension}'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    (Path(cwd) / 'src').mkdir(parents=True)
+    contents = {f'firmware_{index}.bin': os.urandom(20000) + bytes(30000) for index in range(4)}
+    for name, content in contents.items():
+        (Path(cwd) / 'src' / name).write_bytes(content)
+    monkeypatch.setattr(reltools, '_COMPRESSION_BLOCK_SIZE', 16 * 1024)
+    
+    archives_paths = [reltools.prepare_archive(name, 'dist', sorted((Path(cwd) / 'src').iterdir()), 
+                                               files_root=Path(cwd) / 'src', extension=extension, 
+                                               source_date_epoch=1500000000, cwd=cwd) 
+                      for name in ['first', 'second']]
+    with tarfile.open(archives_paths[0], mode) as archive:
+        extracted = {member.name: archive.extractfile(member).read() for member in archive.getmembers()}
+    archives_contents = [path.read_bytes() for path in archives_paths]
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert [path.name for path in archives_paths] == [f'first.{extension}', f'second.{extension}']
+    assert extracted == contents
+    assert archives_contents[0] == archives_contents[1]
+    assert archives_contents[0].count(b'\x1f\x8b\x08' if extension == 'tar.gz' else b'\xfd7zXZ\x00') > 1
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_normalize_tarball_SHOULD_stream_members_into_single_gzip_member(monkeypatch):
+    cwd = TESTS_SETUPS_PATH / 'test_normalize_tarball_SHOULD_stream_members_into_single_gzip_member'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    Path(cwd).mkdir(parents=True)
+    contents = {f'pkg-0.1.0/data_{index}.bin': os.urandom(20000) + bytes(30000) for index in range(4)}
+    sdist_path = Path(cwd) / 'pkg-0.1.0.tar.gz'
+    with tarfile.open(sdist_path, 'w:gz') as archive:
+        for name, content in contents.items():
+            tarinfo = tarfile.TarInfo(name)
+            tarinfo.size = len(content)
+            archive.addfile(tarinfo, io.BytesIO(content))
+    monkeypatch.setattr(reltools, '_COMPRESSION_BLOCK_SIZE', 16 * 1024)
+    reads_sizes = []
+    extractfile = tarfile.TarFile.extractfile
+    def extractfile_spy(self, member):
+        fileobj = extractfile(self, member)
+        read = fileobj.read
+        def read_spy(size=-1):
+            reads_sizes.append(size)
+            return read(size)
+        fileobj.read = read_spy
+        return fileobj
+    monkeypatch.setattr(tarfile.TarFile, 'extractfile', extractfile_spy)
+    
+    reltools.normalize_tarball(sdist_path, 1500000000)
+    monkeypatch.setattr(tarfile.TarFile, 'extractfile', extractfile)
+    sdist_content = sdist_path.read_bytes()
+    decompressor = zlib.decompressobj(wbits=31)
+    decompressor.decompress(sdist_content)
+    with tarfile.open(sdist_path, 'r:gz') as archive:
+        extracted = {member.name: archive.extractfile(member).read() for member in archive.getmembers()}
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert reads_sizes and all(0 < size < 50000 for size in reads_sizes)
+    assert decompressor.eof and decompressor.unused_data == b''
+    assert sdist_content[3] == 0
+    assert int.from_bytes(sdist_content[4:8], 'little') == 1500000000
+    assert extracted == contents
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_prepare_archive_SHOULD_store_entries_uncompressed_WHEN_store_extension():
+    cwd = TESTS_SETUPS_PATH / 'test_prepare_archive_SHOULD_store_entries_uncompressed_WHEN_store_extension'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    (Path(cwd) / 'src').mkdir(parents=True)
+    (Path(cwd) / 'src' / 'payload.bin').write_bytes(bytes(10000))
+    
+    archive_path = reltools.prepare_archive('bundle', 'dist', [Path(cwd) / 'src' / 'payload.bin'], 
+                                            files_root=Path(cwd) / 'src', extension='store', cwd=cwd)
+    with zipfile.ZipFile(archive_path) as archive:
+        infos = [(info.filename, info.compress_type, info.compress_size) for info in archive.infolist()]
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert archive_path.name == 'bundle.zip'
+    assert infos == [('payload.bin', zipfile.ZIP_STORED, 10000)]
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_build_distributions_SHOULD_raise_error_WHEN_setup_py_missing_for_legacy_backend():
+    cwd = TESTS_SETUPS_PATH / 'test_build_distributions_SHOULD_raise_error_WHEN_setup_py_missing_for_legacy_backend'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    
+    with pytest.raises(exceptions.FileNotFoundError) as exc_info:
+        release._build_distributions('0.1.0', cwd=cwd)
+    dist_exists = (Path(cwd) / settings.DirName.DISTRIBUTION).exists()
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert settings.FileName.SETUP_PY in str(exc_info.value)
+    assert not dist_exists
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_get_build_backend_SHOULD_use_default_backend_WHEN_toml_parser_missing(monkeypatch):
+    cwd = TESTS_SETUPS_PATH / 'test_get_build_backend_SHOULD_use_default_backend_WHEN_toml_parser_missing'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    (Path(cwd) / settings.FileName.PYPROJECT).write_text('[build-system]\nbuild-backend = "flit_core.buildapi"\n')
+    
+    backend = release._get_build_backend(cwd)
+    monkeypatch.setitem(sys.modules, 'tomllib', None)
+    monkeypatch.setitem(sys.modules, 'tomli', None)
+    backend_without_parser = release._get_build_backend(cwd)
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert backend == ('flit_core.buildapi', [])
+    assert backend_without_parser == (settings.DEFAULT_BUILD_BACKEND, [])
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_prepare_isolated_tree_SHOULD_link_project_WHEN_project_is_repository_root():
+    cwd = TESTS_SETUPS_PATH / 'test_prepare_isolated_tree_SHOULD_link_project_WHEN_project_is_repository_root'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    Path(cwd).mkdir(parents=True)
+    pygittools.init(cwd)
+    (Path(cwd) / settings.FileName.SETUP_PY).write_text("from setuptools import setup\nsetup()\n")
+    tree_path = Path(cwd) / settings.DirName.DISTRIBUTION / '.wheel-tree'
+    tree_path.mkdir(parents=True)
+    
+    isolated_path, env = release._prepare_isolated_tree(tree_path, {}, cwd)
+    isolated_files = sorted(path.name for path in isolated_path.iterdir())
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert isolated_path == Path(env['GIT_WORK_TREE'])
+    assert isolated_path.parent == tree_path
+    assert isolated_files == [settings.FileName.SETUP_PY]
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_build_distributions_SHOULD_kill_build_backend_WHEN_timeout_or_cancelled():
+    cwd = TESTS_SETUPS_PATH / 'test_build_distributions_SHOULD_kill_build_backend_WHEN_timeout_or_cancelled'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    (Path(cwd) / settings.FileName.PYPROJECT).write_text('[build-system]\n'
+                                                         'build-backend = "slow_backend"\n'
+                                                         'backend-path = ["."]\n')
+    (Path(cwd) / 'slow_backend.py').write_text("import time\n"
+                                               "def build_sdist(sdist_directory, config_settings=None):\n"
+                                               "    print('sdist line', flush=True)\n"
+                                               "    time.sleep(60)\n"
+                                               "def build_wheel(wheel_directory, config_settings=None, metadata_directory=None):\n"
+                                               "    print('wheel line', flush=True)\n"
+                                               "    time.sleep(60)\n")
+    
+    start = time.monotonic()
+    with pytest.raises(exceptions.ExecuteCmdTimeoutError) as exc_info:
+        release._build_distributions('0.1.0', timeout=2, cwd=cwd)
+    cancel_event = threading.Event()
+    threading.Timer(2, cancel_event.set).start()
+    with pytest.raises(exceptions.ExecuteCmdCancelledError):
+        release._build_distributions('0.1.0', cancel_event=cancel_event, cwd=cwd)
+    duration = time.monotonic() - start
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert duration < 30
+    assert str(exc_info.value).splitlines()[-1] in ['sdist line', 'wheel line']
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_build_distributions_SHOULD_report_each_failed_build(caplog):
+    cwd = TESTS_SETUPS_PATH / 'test_build_distributions_SHOULD_report_each_failed_build'
+    if Path(cwd).exists():
+        shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    Path(cwd).mkdir(parents=True, exist_ok=True)
+    (Path(cwd) / settings.FileName.PYPROJECT).write_text('[build-system]\n'
+                                                         'build-backend = "failing_backend"\n'
+                                                         'backend-path = ["."]\n')
+    (Path(cwd) / 'failing_backend.py').write_text("def build_sdist(sdist_directory, config_settings=None):\n"
+                                                  "    raise OSError('sdist broken')\n"
+                                                  "def build_wheel(wheel_directory, config_settings=None, "
+                                                  "metadata_directory=None):\n"
+                                                  "    raise OSError('wheel broken')\n")
+    
+    with pytest.raises(exceptions.RuntimeError):
+        release._build_distributions('0.1.0', cwd=cwd)
+    errors = [record.getMessage() for record in caplog.records if record.levelno == logging.ERROR]
+    
+    shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
+    
+    assert [error.partition(' ')[0] for error in errors] == ['[sdist]', '[wheel]']
+    assert 'sdist broken' in errors[0] and 'wheel broken' in errors[1]
@@ -7,6 +7,8 @@ import inspect
 import stat
 import shutil
 import time
+import sys
+import threading
 import platform
 from pathlib import Path
 from pprint import pprint
@@ -453,4 +455,40 @@ def test_get_latest_tarball_SHOULD_return_proper_latest_tarball():
     
     if Path(cwd).exists():
         shutil.rmtree(Path(cwd), ignore_errors=False, onerror=_error_remove_readonly)
-        
\ No newline at end of file
+        
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_execute_cmd_streaming_SHOULD_forward_lines_and_keep_bounded_tail():
+    lines = []
+    
+    tail = utils.execute_cmd_streaming([sys.executable, '-c', 'for i in range(10): print(i, flush=True)'], 
+                                       output_handler=lines.append, tail_lines=3)
+    
+    assert lines == [str(i) for i in range(10)]
+    assert tail == ['7', '8', '9']
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_execute_cmd_streaming_SHOULD_raise_error_with_output_tail_WHEN_cmd_fails():
+    with pytest.raises(exceptions.ExecuteCmdError) as exc_info:
+        utils.execute_cmd_streaming([sys.executable, '-c', 'import sys; print("one"); print("two"); sys.exit(3)'], 
+                                    output_handler=lambda line: None, tail_lines=1)
+    
+    assert exc_info.value.returncode == 3
+    assert str(exc_info.value).splitlines()[1:] == ['two']
+
+
+@pytest.mark.skipif(SKIP_ALL_MARKED, reason="Skipped on request")
+def test_execute_cmd_streaming_SHOULD_kill_process_WHEN_timeout_or_cancelled():
+    cmd = [sys.executable, '-c', 'import time; print("started", flush=True); time.sleep(30)']
+    cancel_event = threading.Event()
+    
+    start = time.monotonic()
+    with pytest.raises(exceptions.ExecuteCmdTimeoutError) as exc_info:
+        utils.execute_cmd_streaming(cmd, output_handler=lambda line: None, timeout=0.5)
+    threading.Timer(0.5, cancel_event.set).start()
+    with pytest.raises(exceptions.ExecuteCmdCancelledError):
+        utils.execute_cmd_streaming(cmd, output_handler=lambda line: None, cancel_event=cancel_event)
+    
+    assert time.monotonic() - start < 10
+    assert 'started' in str(exc_info.value)